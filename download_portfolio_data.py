@@ -1,11 +1,75 @@
 #!/usr/bin/env python3
 """
 Download real portfolio data from Yahoo Finance
-Requires: pip install yfinance
+Requires: pip install yfinance pyarrow
 """
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
 import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta
+
+CACHE_DIR = Path('.cache')
+CACHE_TTL = 24 * 60 * 60  # Daily bars only change once a day
+
+
+class FileCache:
+    """Parquet-on-disk cache for downloaded price frames, expiring after a TTL."""
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    def _paths(self, key):
+        digest = hashlib.md5(repr(key).encode()).hexdigest()
+        return self.cache_dir / f"{digest}.parquet", self.cache_dir / f"{digest}.meta.json"
+
+    def get(self, key):
+        """Return the cached DataFrame for key, or None if missing or expired."""
+        data_path, meta_path = self._paths(key)
+        if not data_path.exists() or not meta_path.exists():
+            return None
+        with open(meta_path, 'r') as f:
+            saved_at = json.load(f)['timestamp']
+        if time.time() - saved_at >= self.ttl:
+            return None
+        return pd.read_parquet(data_path)
+
+    def set(self, key, df):
+        data_path, meta_path = self._paths(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(data_path, engine='pyarrow', compression='snappy')
+        with open(meta_path, 'w') as f:
+            json.dump({'key': repr(key), 'timestamp': time.time()}, f)
+
+
+file_cache = FileCache()
+
+
+@lru_cache(maxsize=64)
+def _cached_download(tickers, start, end):
+    """
+    Download adjusted close prices, reusing a cached copy from an earlier run when fresh.
+
+    Args:
+        tickers (tuple): Ticker symbols (a tuple so the arguments are hashable).
+        start, end (datetime.date): Date range; whole dates keep the key stable within a day.
+    """
+    key = (tickers, str(start), str(end))
+    prices = file_cache.get(key)
+    if prices is not None:
+        print(f"Using cached prices from {CACHE_DIR}/")
+        return prices
+
+    data = yf.download(list(tickers), start=start, end=end, progress=False, auto_adjust=True)
+    prices = data['Close'] if 'Close' in data.columns else data
+    file_cache.set(key, prices)
+    return prices
+
 
 # Date range: 2 years of data
 end_date = datetime.now()
@@ -16,42 +80,84 @@ print("Downloading Portfolio Data from Yahoo Finance")
 print("="*70)
 print(f"Date Range: {start_date.date()} to {end_date.date()}\n")
 
-# Portfolio 1: Diversified Multi-Asset
-print("1. Downloading Diversified Portfolio...")
 diversified_tickers = ['AAPL', 'MSFT', 'JNJ', 'JPM', 'XOM', 'AGG', 'GLD', 'VNQ']
-diversified_data = yf.download(diversified_tickers, start=start_date, end=end_date, progress=False, auto_adjust=True)
-# Handle both single and multi-ticker downloads
-if len(diversified_tickers) == 1:
-    diversified_prices = diversified_data[['Close']]
+tech_tickers = ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA']
+balanced_tickers = ['SPY', 'QQQ', 'IWM', 'AGG', 'TLT', 'LQD']
+
+portfolio_files = {
+    'data/diversified_portfolio.parquet': diversified_tickers,
+    'data/tech_portfolio.parquet': tech_tickers,
+    'data/balanced_60_40.parquet': balanced_tickers,
+}
+
+
+def load_saved_returns(path, tickers):
+    """Return previously saved returns for a portfolio, or None if missing or stale in shape."""
+    if not Path(path).exists():
+        return None
+    saved = pd.read_parquet(path).set_index('Date')
+    if list(saved.columns) != sorted(tickers) or saved.empty:
+        return None
+    return saved
+
+
+saved_returns = {path: load_saved_returns(path, tickers) for path, tickers in portfolio_files.items()}
+
+# Incremental update: if every portfolio already has saved returns, only fetch from the
+# oldest last-saved date onward. That date is re-fetched (not +1 day) so its close is
+# the base price for the first new return.
+if all(saved is not None for saved in saved_returns.values()):
+    fetch_start = min(saved.index.max() for saved in saved_returns.values()).date()
+    print(f"Existing data found, fetching updates from {fetch_start}")
 else:
-    diversified_prices = diversified_data['Close'] if 'Close' in diversified_data.columns else diversified_data
-diversified_returns = diversified_prices.pct_change().dropna()
-diversified_returns.to_csv('data/diversified_portfolio.csv')
-print(f"   ✅ Saved: data/diversified_portfolio.csv ({len(diversified_returns)} days, {len(diversified_tickers)} assets)")
+    fetch_start = start_date.date()
+
+# Fetch every ticker in one batched request instead of one request per portfolio;
+# overlapping tickers (AAPL, MSFT, AGG) are only downloaded once
+all_tickers = sorted(set(diversified_tickers + tech_tickers + balanced_tickers))
+print(f"Downloading {len(all_tickers)} tickers in one batch...")
+all_prices = _cached_download(tuple(all_tickers), fetch_start, end_date.date())
+
+
+def save_portfolio_returns(tickers, path):
+    """Slice one portfolio out of the batched prices and save its daily returns."""
+    # Sorted to match the column order of a per-portfolio yf.download
+    prices = all_prices[sorted(tickers)]
+    returns = prices.pct_change().dropna()
+
+    saved = saved_returns[path]
+    if saved is not None:
+        # Append only the days after the last saved one, then keep the 2-year window
+        new_returns = returns[returns.index > saved.index.max()]
+        returns = pd.concat([saved, new_returns])
+        returns = returns[returns.index >= pd.Timestamp(start_date.date())]
+        print(f"   ➕ {len(new_returns)} new days")
+
+    returns.reset_index().to_parquet(path, engine='pyarrow', compression='snappy')
+    # Keep the tracked CSV in step: it is what the tier scripts analyze
+    csv_path = Path(path).with_suffix('.csv')
+    returns.to_csv(csv_path)
+    print(f"   ✅ Saved: {path} and {csv_path} ({len(returns)} days, {len(tickers)} assets)")
+    return returns
+
+
+# Portfolio 1: Diversified Multi-Asset
+print("\n1. Diversified Portfolio...")
+diversified_returns = save_portfolio_returns(diversified_tickers, 'data/diversified_portfolio.parquet')
 
 # Portfolio 2: Concentrated Tech
-print("\n2. Downloading Tech Portfolio...")
-tech_tickers = ['AAPL', 'MSFT', 'GOOGL', 'META', 'NVDA']
-tech_data = yf.download(tech_tickers, start=start_date, end=end_date, progress=False, auto_adjust=True)
-tech_prices = tech_data['Close'] if 'Close' in tech_data.columns else tech_data
-tech_returns = tech_prices.pct_change().dropna()
-tech_returns.to_csv('data/tech_portfolio.csv')
-print(f"   ✅ Saved: data/tech_portfolio.csv ({len(tech_returns)} days, {len(tech_tickers)} assets)")
+print("\n2. Tech Portfolio...")
+tech_returns = save_portfolio_returns(tech_tickers, 'data/tech_portfolio.parquet')
 
 # Portfolio 3: Classic 60/40
-print("\n3. Downloading 60/40 Portfolio...")
-balanced_tickers = ['SPY', 'QQQ', 'IWM', 'AGG', 'TLT', 'LQD']
-balanced_data = yf.download(balanced_tickers, start=start_date, end=end_date, progress=False, auto_adjust=True)
-balanced_prices = balanced_data['Close'] if 'Close' in balanced_data.columns else balanced_data
-balanced_returns = balanced_prices.pct_change().dropna()
-balanced_returns.to_csv('data/balanced_60_40.csv')
-print(f"   ✅ Saved: data/balanced_60_40.csv ({len(balanced_returns)} days, {len(balanced_tickers)} assets)")
+print("\n3. 60/40 Portfolio...")
+balanced_returns = save_portfolio_returns(balanced_tickers, 'data/balanced_60_40.parquet')
 
 print("\n" + "="*70)
 print("Summary")
 print("="*70)
 print("\nPortfolio Descriptions:")
-print("\n📊 Diversified Portfolio (diversified_portfolio.csv):")
+print("\n📊 Diversified Portfolio (diversified_portfolio.parquet):")
 print("   - AAPL, MSFT: Tech")
 print("   - JNJ: Healthcare")
 print("   - JPM: Finance")
@@ -61,11 +167,11 @@ print("   - GLD: Gold")
 print("   - VNQ: Real Estate")
 print("   → Tests: Good diversification, lower correlation")
 
-print("\n💻 Tech Portfolio (tech_portfolio.csv):")
+print("\n💻 Tech Portfolio (tech_portfolio.parquet):")
 print("   - AAPL, MSFT, GOOGL, META, NVDA")
 print("   → Tests: High correlation, concentration risk")
 
-print("\n⚖️  60/40 Balanced (balanced_60_40.csv):")
+print("\n⚖️  60/40 Balanced (balanced_60_40.parquet):")
 print("   - SPY, QQQ, IWM: Stocks")
 print("   - AGG, TLT, LQD: Bonds")
 print("   → Tests: Classic allocation, stock-bond correlation")
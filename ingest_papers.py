@@ -8,10 +8,12 @@ import os
 import sys
 from pathlib import Path
 
+import orjson
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from pipeline import ingest_pdf
+from pipeline import ingest_pdfs
 
 def load_registry():
     """Load the papers registry."""
@@ -22,15 +24,17 @@ def load_registry():
 def save_registry(registry):
     """Save the updated papers registry."""
     registry_path = Path(__file__).parent / 'papers' / 'papers_registry.json'
-    with open(registry_path, 'w') as f:
-        json.dump(registry, f, indent=2)
+    # orjson serializes in C; OPT_INDENT_2 keeps the same layout as json.dump(indent=2)
+    with open(registry_path, 'wb') as f:
+        f.write(orjson.dumps(registry, option=orjson.OPT_INDENT_2))
 
-def ingest_all_papers(force=False):
+def ingest_all_papers(force=False, max_workers=4):
     """
     Ingest all papers from the registry.
 
     Args:
         force: If True, re-ingest papers even if already ingested
+        max_workers: Number of PDFs to load and chunk concurrently
     """
     registry = load_registry()
     papers_dir = Path(__file__).parent / 'papers'
@@ -45,6 +49,13 @@ def ingest_all_papers(force=False):
     print(f"{'='*70}\n")
     print(f"Found {total_papers} papers in registry\n")
 
+    # One directory walk instead of an exists() probe per registry entry;
+    # keyed by category/filename so the lookup matches the registry layout
+    available = {p.relative_to(papers_dir): p for p in papers_dir.rglob('*.pdf')}
+
+    # Report lines are collected and written in one go rather than one print per line
+    report = []
+    to_ingest = []
     for paper in registry['papers']:
         paper_id = paper['id']
         filename = paper['filename']
@@ -52,40 +63,57 @@ def ingest_all_papers(force=False):
         title = paper['title']
         already_ingested = paper.get('ingested', False)
 
-        # Construct full path
-        pdf_path = papers_dir / category / filename
+        # Look up the full path from the directory scan
+        pdf_path = available.get(Path(category) / filename)
 
         # Skip if already ingested (unless force)
         if already_ingested and not force:
-            print(f"⏭️  SKIP: {title}")
-            print(f"   Already ingested (use --force to re-ingest)")
+            report.append(f"⏭️  SKIP: {title}")
+            report.append(f"   Already ingested (use --force to re-ingest)")
             skipped_count += 1
             continue
 
         # Check if file exists
-        if not pdf_path.exists():
-            print(f"❌ ERROR: {title}")
-            print(f"   File not found: {pdf_path}")
-            print(f"   Please add the PDF to: papers/{category}/")
+        if pdf_path is None:
+            report.append(f"❌ ERROR: {title}")
+            report.append(f"   File not found: {papers_dir / category / filename}")
+            report.append(f"   Please add the PDF to: papers/{category}/")
             error_count += 1
             continue
 
-        # Ingest the paper
-        print(f"📄 INGESTING: {title}")
-        print(f"   Authors: {', '.join(paper['authors'])}")
-        print(f"   Year: {paper['year']}")
-        print(f"   Category: {category}")
-        print(f"   File: {pdf_path}")
+        # Queue the paper for ingestion
+        report.append(f"📄 QUEUED: {title}")
+        report.append(f"   Authors: {', '.join(paper['authors'])}")
+        report.append(f"   Year: {paper['year']}")
+        report.append(f"   Category: {category}")
+        report.append(f"   File: {pdf_path}")
+        to_ingest.append((paper, pdf_path))
+
+    sys.stdout.write("\n".join(report) + "\n")
+    report.clear()
 
+    # One bulk call: PDFs are chunked concurrently, then every chunk is embedded
+    # and uploaded in large batches instead of a round of API calls per paper
+    if to_ingest:
         try:
-            ingest_pdf(str(pdf_path), title)
-            paper['ingested'] = True
-            ingested_count += 1
-            print(f"   ✅ Success!\n")
+            failed = ingest_pdfs(
+                [(str(pdf_path), paper['title']) for paper, pdf_path in to_ingest],
+                max_workers=max_workers,
+            )
         except Exception as e:
-            print(f"   ❌ Failed: {str(e)}\n")
-            error_count += 1
-            continue
+            report.append(f"   ❌ Failed to store chunks: {str(e)}\n")
+            failed = {str(pdf_path): e for paper, pdf_path in to_ingest}
+
+        for paper, pdf_path in to_ingest:
+            if str(pdf_path) in failed:
+                report.append(f"   ❌ Failed: {paper['title']}: {str(failed[str(pdf_path)])}\n")
+                error_count += 1
+            else:
+                paper['ingested'] = True
+                ingested_count += 1
+                report.append(f"   ✅ Success: {paper['title']}\n")
+
+        sys.stdout.write("\n".join(report) + "\n")
 
     # Save updated registry
     save_registry(registry)
@@ -0,0 +1,30 @@
+"""Load portfolio return fixtures for the tier test scripts"""
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Derived parquet copies live apart from data/, where download_portfolio_data.py
+# writes (and reads back) its own portfolio parquet files
+CACHE_DIR = Path('.cache') / 'fixtures'
+
+
+def load_portfolio(path):
+    """
+    Load a returns CSV through its parquet copy, indexed by Date.
+
+    The CSV is parsed once with pyarrow and saved under CACHE_DIR as parquet (Date
+    column, snappy); later runs read the parquet unless the CSV is newer.
+    """
+    csv_path = Path(path)
+    parquet_path = CACHE_DIR / csv_path.with_suffix('.parquet').name
+    if not parquet_path.exists() or parquet_path.stat().st_mtime < csv_path.stat().st_mtime:
+        parquet_path.parent.mkdir(parents=True, exist_ok=True)
+        table = pacsv.read_csv(
+            csv_path,
+            convert_options=pacsv.ConvertOptions(column_types={'Date': pa.timestamp('ns')}),
+        )
+        table.to_pandas().to_parquet(parquet_path, engine='pyarrow', compression='snappy', index=False)
+    return pd.read_parquet(parquet_path).set_index('Date')
+
@@ -1,9 +1,20 @@
 from fastapi import FastAPI, UploadFile, File
+from fastapi.responses import Response
 import pandas as pd
 import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import asyncio
+import hashlib
+import io
 import os
-from src.metrics import analyze_portfolio
-from src.pipeline import query_fincanon
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.metrics import analyze_portfolio_unchecked
+from src.pipeline import aquery_fincanon
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -25,6 +36,96 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Process-wide LRU cache of serialized /analyze responses, keyed by a hash of the uploaded
+# bytes. Dashboard reloads re-post the same file, so repeat uploads skip parsing, analysis
+# and serialization.
+ANALYZE_CACHE_MAXSIZE = 128
+_analyze_cache = OrderedDict()
+_analyze_cache_lock = threading.Lock()
+_analyze_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _analyze_cache_get(key):
+    with _analyze_cache_lock:
+        if key in _analyze_cache:
+            _analyze_cache.move_to_end(key)
+            _analyze_cache_stats["hits"] += 1
+            return _analyze_cache[key]
+        _analyze_cache_stats["misses"] += 1
+        return None
+
+
+def _analyze_cache_put(key, payload):
+    with _analyze_cache_lock:
+        _analyze_cache[key] = payload
+        _analyze_cache.move_to_end(key)
+        if len(_analyze_cache) > ANALYZE_CACHE_MAXSIZE:
+            _analyze_cache.popitem(last=False)
+
+
+def _read_csv_upload(body: bytes):
+    """
+    Parse an uploaded portfolio CSV with pyarrow's multithreaded reader.
+
+    Returns (df, weights) where weights is None if the CSV has no 'Weights' row.
+    The first column (dates plus the 'Weights' label) is kept as strings.
+    """
+    index_name = body.split(b'\n', 1)[0].decode('utf-8-sig').split(',')[0].strip().strip('"')
+    table = pacsv.read_csv(
+        pa.BufferReader(body),
+        parse_options=pacsv.ParseOptions(delimiter=','),
+        convert_options=pacsv.ConvertOptions(column_types={index_name: pa.string()}),
+    )
+
+    weights = None
+    is_weights = pc.fill_null(pc.equal(table.column(0), 'Weights'), False)
+    if pc.any(is_weights).as_py():
+        weights_row = table.filter(is_weights).slice(0, 1)
+        weights = np.array(
+            [weights_row.column(i)[0].as_py() for i in range(1, table.num_columns)],
+            dtype=float,
+        )
+        table = table.filter(pc.invert(is_weights))
+
+    # Numeric columns are handed to pandas without a copy
+    df = table.to_pandas(self_destruct=True).set_index(index_name)
+    return df, weights
+
+
+# Parsing and analyze_portfolio are CPU-bound; running them here keeps the event loop
+# free for other requests (NumPy/BLAS release the GIL for the heavy kernels)
+ANALYZE_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+
+def _analyze_sync(body: bytes, is_parquet: bool):
+    """Parse an uploaded portfolio file and compute its metrics (runs on ANALYZE_POOL)."""
+    weights = None
+    if is_parquet:
+        # Columnar load; Date is stored as a regular column, restore it as the index
+        df = pd.read_parquet(io.BytesIO(body))
+        if 'Date' in df.columns:
+            df = df.set_index('Date')
+    else:
+        # Read CSV into DataFrame, splitting off the weights row if present
+        df, weights = _read_csv_upload(body)
+
+        if weights is not None:
+            # Validate weights sum to ~1.0
+            weights_sum = weights.sum()
+            if not np.isclose(weights_sum, 1.0, atol=0.01):
+                return {"error": f"Weights must sum to 1.0 (got {weights_sum:.4f})"}
+
+    # Convert index to datetime; the fixed ISO format takes pandas' fast C path
+    # instead of per-row dateutil inference, which remains the fallback
+    try:
+        df.index = pd.to_datetime(df.index, format='%Y-%m-%d', cache=True)
+    except ValueError:
+        df.index = pd.to_datetime(df.index)
+
+    # Compute portfolio metrics; the index and weights are already normalized above
+    return analyze_portfolio_unchecked(df, weights=weights)
+
+
 @app.get("/")
 def read_root():
     return {"message": "Hello from FinCanon backend 🚀"}
@@ -36,7 +137,7 @@ def ping():
 @app.post("/analyze")
 async def analyze(file: UploadFile = File(...)):
     """
-    Accepts a CSV file upload (portfolio data),
+    Accepts a CSV or Parquet file upload (portfolio data),
     computes metrics using analyze_portfolio,
     and returns the results as JSON.
 
@@ -44,29 +145,40 @@ async def analyze(file: UploadFile = File(...)):
     - Row 1: Header with 'Date' and asset tickers
     - Row 2: 'Weights' and corresponding portfolio weights (must sum to 1.0)
     - Row 3+: Dates and daily returns (as decimals)
-    """
-    # Read CSV into DataFrame
-    df = pd.read_csv(file.file, index_col=0, parse_dates=False)
 
-    # Extract weights if present (second row with index='Weights')
-    weights = None
-    if 'Weights' in df.index:
-        weights = df.loc['Weights'].values.astype(float)
-        # Remove weights row from dataframe
-        df = df.drop('Weights')
-
-        # Validate weights sum to ~1.0
-        weights_sum = weights.sum()
-        if not np.isclose(weights_sum, 1.0, atol=0.01):
-            return {"error": f"Weights must sum to 1.0 (got {weights_sum:.4f})"}
-
-    # Convert index to datetime
-    df.index = pd.to_datetime(df.index)
-
-    # Compute portfolio metrics
-    results = analyze_portfolio(df, weights=weights)
-
-    return results
+    Parquet format (as written by download_portfolio_data.py):
+    - A 'Date' column plus one column of daily returns per asset
+    - Equal weighting is used since there is no weights row
+    """
+    body = await file.read()
+    is_parquet = bool(file.filename and file.filename.endswith('.parquet'))
+
+    # BLAKE2b hashes a typical upload in microseconds, far below the cost of the analysis
+    cache_key = (is_parquet, hashlib.blake2b(body, digest_size=16).hexdigest())
+    cached = _analyze_cache_get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(ANALYZE_POOL, _analyze_sync, body, is_parquet)
+
+    # One C-level pass: NumPy arrays are written directly and NaN/Inf become null
+    payload = orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY)
+    if "error" not in results:
+        _analyze_cache_put(cache_key, payload)
+
+    return Response(content=payload, media_type="application/json")
+
+@app.get("/analyze/cache_info")
+def analyze_cache_info():
+    """Report /analyze cache statistics, mirroring functools.lru_cache's cache_info()."""
+    with _analyze_cache_lock:
+        return {
+            "hits": _analyze_cache_stats["hits"],
+            "misses": _analyze_cache_stats["misses"],
+            "maxsize": ANALYZE_CACHE_MAXSIZE,
+            "currsize": len(_analyze_cache),
+        }
 
 @app.post("/query")
 async def query(payload: dict):
@@ -79,5 +191,5 @@ async def query(payload: dict):
     question = payload["question"]
     portfolio_metrics = payload.get("portfolio_metrics", None)
 
-    answer, sources = query_fincanon(question, portfolio_context=portfolio_metrics)
+    answer, sources = await aquery_fincanon(question, portfolio_context=portfolio_metrics)
     return {"answer": answer, "sources": sources}
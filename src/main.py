@@ -1,6 +1,9 @@
+import sys
+from pathlib import Path
+
 import pandas as pd
 
-from pipeline import ingest_pdf, query_fincanon, build_qa_chain
+from pipeline import ingest_pdfs, query_fincanon, build_qa_chain
 from metrics import analyze_portfolio
 
 
@@ -28,8 +31,7 @@ for i, source in enumerate(sources, 1):
 if __name__ == "__main__":
    # papers = [("markowitz_JF.pdf", "Portfolio Selection"), ("Sharpe_1964.pdf","Capital Asset Pricing Model"),("FAMA_FRENCH.pdf","The Cross-Section of Expected Stock Returns")]
 
-   # for file_path, title in papers:
-   #     ingest_pdf(file_path, title)
+   # ingest_pdfs(papers)
    # 
    # qa = build_qa_chain()
    # query = "How do Fama-French’s factors extend CAPM?"
@@ -41,22 +43,25 @@ if __name__ == "__main__":
    # for doc in result["source_documents"]:
    #     print("-", doc.metadata)
 
-    df = pd.read_csv("../data/sample_portfolio.csv", index_col=0, parse_dates=True)
+    # Parse the CSV once and reuse a parquet copy on later runs (re-converted if the CSV changes)
+    csv_path = Path("../data/sample_portfolio.csv")
+    parquet_path = csv_path.with_suffix(".parquet")
+    if not parquet_path.exists() or parquet_path.stat().st_mtime < csv_path.stat().st_mtime:
+        pd.read_csv(csv_path, index_col=0, parse_dates=True).to_parquet(parquet_path)
+    df = pd.read_parquet(parquet_path)
 
 
 
 
     results_equal = analyze_portfolio(df)
     print("\n=== Equal-Weight Portfolio ===")
-    for k, v in results_equal.items():
-        print(f"{k}: {v}")
+    sys.stdout.write("\n".join(f"{k}: {v}" for k, v in results_equal.items()) + "\n")
 
     # Example 2: Custom-weight portfolio
     # 50% AAPL, 30% MSFT, 20% SPY
     custom_weights = [0.5, 0.3, 0.2]
     results_custom = analyze_portfolio(df, weights=custom_weights)
     print("\n=== Custom-Weight Portfolio (50/30/20) ===")
-    for k, v in results_custom.items():
-        print(f"{k}: {v}")
+    sys.stdout.write("\n".join(f"{k}: {v}" for k, v in results_custom.items()) + "\n")
     #print(results)
 
@@ -1,32 +1,99 @@
+import copy
+import math
+import warnings
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
+from scipy.linalg import cho_factor, cho_solve
 from scipy.optimize import minimize
 
+
+# Annualization constants as plain Python floats (no per-call NumPy scalar dispatch)
+_TRADING_DAYS = 252
+_ANN_FACTOR = math.sqrt(_TRADING_DAYS)
+
+
+def _portfolio_stats(X, w, rf, equal_weight=False):
+    """Means, vols, covariance and portfolio return/vol/Sharpe using NumPy/BLAS.
+
+    With equal_weight, w is ignored: the portfolio return is the mean of the asset
+    means and the variance is 1'Σ1/n², which skips the matrix-vector product.
+    """
+    n_obs, n_assets = X.shape
+    mean = X.mean(axis=0)
+    # One centred copy feeds both the variances and the covariance
+    Xc = X - mean
+    vol = np.sqrt(np.einsum('ij,ij->j', Xc, Xc) / (n_obs - 1))
+    cov = (Xc.T @ Xc) / (n_obs - 1)
+    if equal_weight:
+        port_return = mean.mean()
+        port_vol = np.sqrt(cov.sum()) / n_assets
+    else:
+        port_return = np.dot(mean, w)
+        port_vol = np.sqrt(w @ cov @ w)
+    sharpe = (port_return - rf) / port_vol if port_vol > 0 else np.nan
+    return mean, vol, cov, port_return, port_vol, sharpe
+
+def _drawdown_path(r):
+    """
+    Cumulative growth of 1 and the drawdown from its running peak, as NumPy arrays.
+
+    NaN returns are skipped and left NaN in both outputs, as pandas' cumprod does.
+    """
+    growth = 1.0 + r
+    gaps = np.isnan(growth)
+    if gaps.any():
+        growth = np.where(gaps, 1.0, growth)
+    cumulative = np.cumprod(growth)
+    running_max = np.maximum.accumulate(cumulative)
+    drawdown = (cumulative - running_max) / running_max
+    if gaps.any():
+        cumulative[gaps] = np.nan
+        drawdown[gaps] = np.nan
+    return cumulative, drawdown
+
+def _sortino(r, rf):
+    """Mean excess return over the sample std of the negative excess returns (NaNs skipped)."""
+    excess = r - rf
+    excess = excess[~np.isnan(excess)]
+    downside = excess[excess < 0]
+    if downside.size < 2:
+        return np.nan
+    downside_std = downside.std(ddof=1)
+    if downside_std == 0:
+        return np.nan
+    return excess.mean() / downside_std
+
+def _rolling_mean_std(r, window):
+    """
+    Mean and sample std of every full window of r (len(r) - window + 1 values each).
+
+    NaN returns are skipped within each window.
+    """
+    rolling = pd.Series(r).rolling(window, min_periods=1)
+    return rolling.mean().to_numpy()[window - 1:], rolling.std().to_numpy()[window - 1:]
+
 def calculate_max_drawdown(returns: pd.Series):
     """Calculate maximum drawdown from a returns series."""
-    cumulative = (1 + returns).cumprod()
-    running_max = cumulative.expanding().max()
-    drawdown = (cumulative - running_max) / running_max
-    return drawdown.min()
+    _, drawdown = _drawdown_path(np.asarray(returns, dtype=np.float64))
+    return float(np.nanmin(drawdown))
 
 def calculate_sortino_ratio(returns: pd.Series, risk_free_rate=0.0):
     """Calculate Sortino ratio (return / downside deviation)."""
-    excess_returns = returns - risk_free_rate
-    downside_returns = excess_returns[excess_returns < 0]
-    downside_std = downside_returns.std()
-
-    if downside_std == 0 or np.isnan(downside_std):
-        return np.nan
-
-    return excess_returns.mean() / downside_std
+    return float(_sortino(np.asarray(returns, dtype=np.float64), risk_free_rate))
 
 def calculate_beta(portfolio_returns: pd.Series, market_returns: pd.Series):
     """Calculate portfolio beta vs market (usually SPY)."""
     if len(portfolio_returns) != len(market_returns):
         return np.nan
 
-    covariance = np.cov(portfolio_returns, market_returns)[0][1]
-    market_variance = np.var(market_returns)
+    # Scalar sample covariance (as np.cov, ddof=1) without building the 2x2 matrix
+    p = np.asarray(portfolio_returns, dtype=np.float64)
+    m = np.asarray(market_returns, dtype=np.float64)
+    m_centered = m - m.mean()
+    covariance = np.dot(p - p.mean(), m_centered) / (len(m) - 1)
+    market_variance = np.dot(m_centered, m_centered) / len(m)
 
     if market_variance == 0:
         return np.nan
@@ -36,7 +103,7 @@ def calculate_beta(portfolio_returns: pd.Series, market_returns: pd.Series):
 def portfolio_stats(weights, mean_returns, cov_matrix):
     """Calculate portfolio return and volatility for given weights."""
     portfolio_return = np.dot(weights, mean_returns)
-    portfolio_vol = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
+    portfolio_vol = np.sqrt(weights @ cov_matrix @ weights)
     return portfolio_return, portfolio_vol
 
 def neg_sharpe_ratio(weights, mean_returns, cov_matrix, risk_free_rate=0):
@@ -50,16 +117,166 @@ def portfolio_volatility(weights, mean_returns, cov_matrix):
     """Portfolio volatility for minimization."""
     return portfolio_stats(weights, mean_returns, cov_matrix)[1]
 
-def optimize_portfolio(mean_returns, cov_matrix, risk_free_rate=0):
+def _volatility_and_grad(weights, cov_matrix):
+    """Portfolio volatility and its gradient Σw/σ, sharing one Σw product (for jac=True).
+
+    Evaluated in cov_matrix's dtype; SLSQP itself always gets float64 back.
+    """
+    w = weights.astype(cov_matrix.dtype, copy=False)
+    sigma_w = cov_matrix @ w
+    vol = float(np.sqrt(w @ sigma_w))
+    if vol == 0:
+        return 0.0, np.zeros_like(weights)
+    return vol, (sigma_w / vol).astype(np.float64)
+
+def _neg_sharpe_and_grad(weights, mean_returns, cov_matrix, risk_free_rate=0):
+    """Negative Sharpe ratio and its gradient -μ/σ + (μ'w - rf)·Σw/σ³ (for jac=True)."""
+    w = weights.astype(cov_matrix.dtype, copy=False)
+    sigma_w = cov_matrix @ w
+    vol = float(np.sqrt(w @ sigma_w))
+    if vol == 0:
+        return np.inf, np.zeros_like(weights)
+    excess = float(w @ mean_returns) - risk_free_rate
+    return -excess / vol, (-mean_returns / vol + excess * sigma_w / vol**3).astype(np.float64)
+
+def _max_sharpe_qp(mean_returns, cov_matrix, risk_free_rate, bounds_count):
+    """
+    Long-only max-Sharpe weights via the Schaible/Charnes-Cooper transform, or None.
+
+    With y = κw, maximizing (μ'w - rf)/σ becomes the convex QP min y'Σy subject to
+    (μ - rf)'y = 1, y ≥ 0, whose minimum is unique; w = y / 1'y. Needs at least one
+    asset with μ > rf. μ - rf and Σ are rescaled to O(1) so SLSQP's tolerance is
+    meaningful; the scaling only changes κ, not w.
+    """
+    excess = mean_returns - risk_free_rate
+    best = excess.max()
+    if not best > 0:
+        return None
+    excess = excess / best
+    scale = np.trace(cov_matrix) / len(cov_matrix)
+    if not scale > 0:
+        return None
+    sigma = cov_matrix / scale
+
+    def objective(y):
+        sigma_y = sigma @ y.astype(sigma.dtype, copy=False)
+        return float(y @ sigma_y), (2 * sigma_y).astype(np.float64)
+
+    # Feasible start: the assets that beat the risk-free rate, scaled onto the constraint
+    excess64 = excess.astype(np.float64)
+    positive = (excess64 > 0).astype(np.float64)
+    guess = positive / (excess64 @ positive)
+    result = minimize(
+        objective,
+        guess,
+        jac=True,
+        method='SLSQP',
+        bounds=tuple((0, None) for _ in range(bounds_count)),
+        constraints={'type': 'eq', 'fun': lambda y: excess64 @ y - 1, 'jac': lambda y: excess64},
+        options={'maxiter': 1000, 'ftol': 1e-12},
+    )
+    if not result.success:
+        return None
+    return _long_only_or_none(np.clip(result.x, 0, None))
+
+def _solver_arrays(mean_returns, cov_matrix, dtype):
+    """
+    float64 mean/covariance for reporting, plus the copies the SLSQP objectives evaluate.
+
+    A narrower dtype (e.g. np.float32) halves the bytes each Σw evaluation touches at
+    the cost of ~7 significant digits, which is ample for daily-return covariances.
+    Ill-conditioned covariances (cond > 1e6) stay in float64, where the rounding
+    would otherwise swamp the solver's tolerance, with a warning.
+    """
+    mean64 = np.asarray(mean_returns, dtype=np.float64)
+    cov64 = np.asarray(cov_matrix, dtype=np.float64)
+    if np.dtype(dtype) == np.float64:
+        return mean64, cov64, mean64, cov64
+    cond = np.linalg.cond(cov64)
+    if cond > 1e6:
+        warnings.warn(
+            f"Covariance is ill-conditioned (cond={cond:.2g}); optimizing in float64 instead "
+            f"of {np.dtype(dtype).name}. A shrunk estimate (shrink=True) is better conditioned.",
+            RuntimeWarning,
+            stacklevel=3,
+        )
+        return mean64, cov64, mean64, cov64
+    return mean64, cov64, mean64.astype(dtype), cov64.astype(dtype)
+
+def ledoit_wolf_shrinkage(returns):
+    """
+    Ledoit-Wolf shrinkage intensity for a (n_obs, n_assets) returns matrix.
+
+    The optimal weight δ in (1-δ)Σ + δ·(tr Σ / N)·I, the same estimate as
+    sklearn.covariance.LedoitWolf, computed with NumPy. Rows with a missing return
+    are dropped, so δ is estimated on the complete observations.
+    """
+    returns = returns[~np.isnan(returns).any(axis=1)]
+    if len(returns) < 2:
+        return 0.0
+    X = returns - returns.mean(axis=0)
+    n_obs, n_assets = X.shape
+    emp_cov = (X.T @ X) / n_obs
+    mu = np.trace(emp_cov) / n_assets
+    # Distance of the sample covariance from the target, and the estimation error of its entries
+    delta = ((emp_cov - mu * np.eye(n_assets)) ** 2).sum() / n_assets
+    X2 = X ** 2
+    beta = ((X2.T @ X2).sum() / n_obs - (emp_cov ** 2).sum()) / (n_assets * n_obs)
+    if delta <= 0:
+        return 0.0
+    return float(min(beta, delta) / delta)
+
+def shrink_covariance(cov_matrix, shrinkage):
+    """(1-δ)Σ + δ·(tr Σ / N)·I; better conditioned than Σ for short histories."""
+    n_assets = len(cov_matrix)
+    target = np.trace(cov_matrix) / n_assets
+    shrunk = (1 - shrinkage) * cov_matrix
+    shrunk[np.diag_indices(n_assets)] += shrinkage * target
+    return shrunk
+
+def _markowitz_terms(mean_returns, cov_matrix):
+    """
+    Σ⁻¹1 and Σ⁻¹μ from a single Cholesky factorization, shared by the closed-form
+    portfolios below. Returns None if Σ is not positive definite or not finite.
+    """
+    try:
+        factor = cho_factor(cov_matrix)
+    except (np.linalg.LinAlgError, ValueError):
+        return None
+    solved = cho_solve(factor, np.column_stack([np.ones(len(mean_returns)), mean_returns]))
+    return solved[:, 0], solved[:, 1]
+
+def _long_only_or_none(direction):
+    """
+    Normalize Σ⁻¹(...) to sum to 1 if it is a valid long-only portfolio, else None.
+
+    Markowitz's Lagrangian solutions W* = Σ⁻¹(λ1μ + λ2·1) ignore the [0, 1] bounds;
+    when the result is non-negative anyway the bounds are inactive, so it is also the
+    exact constrained optimum and the numerical solver can be skipped.
+    """
+    total = direction.sum()
+    if not np.isfinite(total) or total <= 0:
+        return None
+    weights = direction / total
+    if (weights < 0).any():
+        return None
+    return weights
+
+def optimize_portfolio(mean_returns, cov_matrix, risk_free_rate=0, dtype=np.float64):
     """
     Find optimal portfolios:
     - Minimum variance portfolio
     - Maximum Sharpe ratio portfolio
+
+    dtype sets the precision of the objective evaluations (see _solver_arrays);
+    the reported stats are always computed in float64.
     """
     n_assets = len(mean_returns)
+    mean_returns, cov_matrix, mean_solve, cov_solve = _solver_arrays(mean_returns, cov_matrix, dtype)
 
     # Constraints: weights sum to 1
-    constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+    ones = np.ones(n_assets)
+    constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: ones}
 
     # Bounds: each weight between 0 and 1 (long-only)
     bounds = tuple((0, 1) for _ in range(n_assets))
@@ -67,31 +284,48 @@ def optimize_portfolio(mean_returns, cov_matrix, risk_free_rate=0):
     # Initial guess: equal weights
     initial_guess = np.array([1/n_assets] * n_assets)
 
-    # Minimize variance
-    min_var_result = minimize(
-        portfolio_volatility,
-        initial_guess,
-        args=(mean_returns, cov_matrix),
-        method='SLSQP',
-        bounds=bounds,
-        constraints=constraints
-    )
+    # Closed-form candidates from one factorization of Σ
+    terms = _markowitz_terms(mean_returns, cov_matrix)
+    sigma_inv_1, sigma_inv_mu = terms if terms is not None else (None, None)
 
-    # Maximize Sharpe (minimize negative Sharpe)
-    max_sharpe_result = minimize(
-        neg_sharpe_ratio,
-        initial_guess,
-        args=(mean_returns, cov_matrix, risk_free_rate),
-        method='SLSQP',
-        bounds=bounds,
-        constraints=constraints
-    )
+    # Minimize variance: closed form Σ⁻¹1 / 1'Σ⁻¹1 when it is already long-only,
+    # otherwise SLSQP (analytic gradients instead of finite differences)
+    min_var_weights = _long_only_or_none(sigma_inv_1) if terms is not None else None
+    if min_var_weights is None:
+        min_var_result = minimize(
+            _volatility_and_grad,
+            initial_guess,
+            args=(cov_solve,),
+            jac=True,
+            method='SLSQP',
+            bounds=bounds,
+            constraints=constraints
+        )
+        min_var_weights = min_var_result.x
+
+    # Maximize Sharpe: the tangency portfolio Σ⁻¹(μ - rf·1), normalized, when it is
+    # long-only; otherwise the equivalent convex QP, and only if no asset beats rf
+    # (where the transform doesn't apply) minimize negative Sharpe directly
+    max_sharpe_weights = None
+    if terms is not None:
+        max_sharpe_weights = _long_only_or_none(sigma_inv_mu - risk_free_rate * sigma_inv_1)
+    if max_sharpe_weights is None:
+        max_sharpe_weights = _max_sharpe_qp(mean_solve, cov_solve, risk_free_rate, n_assets)
+    if max_sharpe_weights is None:
+        max_sharpe_result = minimize(
+            _neg_sharpe_and_grad,
+            initial_guess,
+            args=(mean_solve, cov_solve, risk_free_rate),
+            jac=True,
+            method='SLSQP',
+            bounds=bounds,
+            constraints=constraints
+        )
+        max_sharpe_weights = max_sharpe_result.x
 
     # Calculate stats for optimal portfolios
-    min_var_weights = min_var_result.x
     min_var_return, min_var_vol = portfolio_stats(min_var_weights, mean_returns, cov_matrix)
 
-    max_sharpe_weights = max_sharpe_result.x
     max_sharpe_return, max_sharpe_vol = portfolio_stats(max_sharpe_weights, mean_returns, cov_matrix)
 
     return {
@@ -109,54 +343,154 @@ def optimize_portfolio(mean_returns, cov_matrix, risk_free_rate=0):
         }
     }
 
-def calculate_efficient_frontier(mean_returns, cov_matrix, num_portfolios=20):
+def _two_fund_terms(mu, sigma):
+    """
+    Σ⁻¹1, Σ⁻¹μ and the scalars A = 1'Σ⁻¹1, B = 1'Σ⁻¹μ, C = μ'Σ⁻¹μ, D = AC - B² of
+    the two-fund frontier solution, or None if Σ is singular or μ is (nearly)
+    parallel to 1, where there is no closed form.
+    """
+    terms = _markowitz_terms(mu, sigma)
+    if terms is None:
+        return None
+    sigma_inv_1, sigma_inv_mu = terms
+    a_term, b_term, c_term = sigma_inv_1.sum(), sigma_inv_mu.sum(), mu @ sigma_inv_mu
+    d_term = a_term * c_term - b_term ** 2
+    if not d_term > 1e-12 * a_term * c_term:
+        return None
+    return sigma_inv_1, sigma_inv_mu, a_term, b_term, c_term, d_term
+
+def _frontier_on_support(mu, sigma, support, support_terms, target_return):
+    """
+    Minimum-variance weights for target_return with only the assets in support held,
+    or None if that is not the long-only optimum.
+
+    On the support the weights are the two-fund solution of the reduced problem. They
+    are the constrained optimum when they are non-negative and the KKT multipliers of
+    the zero weights, ν = Σw - λμ·μ - λ1·1, are non-negative too: the same check the
+    Critical Line Algorithm makes between turning points, where the support is fixed.
+    """
+    if support_terms is None:
+        return None
+    sigma_inv_1, sigma_inv_mu, a_term, b_term, c_term, d_term = support_terms
+    lambda_mu = (a_term * target_return - b_term) / d_term
+    lambda_1 = (c_term - b_term * target_return) / d_term
+    weights = np.zeros(len(mu))
+    weights[support] = lambda_mu * sigma_inv_mu + lambda_1 * sigma_inv_1
+    if (weights < 0).any():
+        return None
+    if not support.all():
+        sigma_w = sigma @ weights
+        nu = (sigma_w - lambda_mu * mu - lambda_1)[~support]
+        if (nu < -1e-9 * np.abs(sigma_w).max()).any():
+            return None
+    return weights
+
+def calculate_efficient_frontier(mean_returns, cov_matrix, num_portfolios=20, dtype=np.float64):
     """
     Calculate efficient frontier points.
     Returns portfolios with different target returns.
+
+    Targets are visited in order of return. Each first tries the closed-form frontier
+    portfolio Σ⁻¹(λ1μ + λ2·1), then the same solution restricted to the assets held at
+    the previous target: between the frontier's turning points the set of held assets
+    doesn't change, so most targets are solved exactly. Only targets past a turning
+    point are solved with SLSQP, warm-started from the previous solution, with
+    analytic gradients for the objective and constraints. dtype sets the precision of
+    the volatility evaluations, as in optimize_portfolio.
     """
     n_assets = len(mean_returns)
+    mu, sigma, _, sigma_solve = _solver_arrays(mean_returns, cov_matrix, dtype)
+
+    # Two-fund terms of the full problem, and per support of the reduced problems
+    full_support = np.ones(n_assets, dtype=bool)
+    support_terms = {full_support.tobytes(): _two_fund_terms(mu, sigma)}
 
     # Find min and max possible returns
-    min_ret = np.min(mean_returns)
-    max_ret = np.max(mean_returns)
+    min_ret = np.min(mu)
+    max_ret = np.max(mu)
 
     # Generate target returns
     target_returns = np.linspace(min_ret, max_ret, num_portfolios)
 
-    frontier_portfolios = []
+    frontier_weights = []
+
+    bounds = tuple((0, 1) for _ in range(n_assets))
+    ones = np.ones(n_assets)
+    guess = ones / n_assets
 
     for target_return in target_returns:
         # Constraints: weights sum to 1, and portfolio return equals target
         constraints = [
-            {'type': 'eq', 'fun': lambda x: np.sum(x) - 1},
-            {'type': 'eq', 'fun': lambda x: np.dot(x, mean_returns) - target_return}
+            {'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: ones},
+            {'type': 'eq', 'fun': lambda x: np.dot(x, mu) - target_return, 'jac': lambda x: mu}
         ]
 
-        bounds = tuple((0, 1) for _ in range(n_assets))
-        initial_guess = np.array([1/n_assets] * n_assets)
-
-        result = minimize(
-            portfolio_volatility,
-            initial_guess,
-            args=(mean_returns, cov_matrix),
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints,
-            options={'maxiter': 1000}
+        weights = _frontier_on_support(
+            mu, sigma, full_support, support_terms[full_support.tobytes()], target_return
         )
-
-        if result.success:
-            weights = result.x
-            ret, vol = portfolio_stats(weights, mean_returns, cov_matrix)
-            frontier_portfolios.append({
-                'return': ret,
-                'volatility': vol,
-                'weights': weights.tolist()
-            })
-
-    return frontier_portfolios
-
-def analyze_portfolio(df: pd.DataFrame, weights=None, risk_free_rate=0.04):
+        if weights is None and frontier_weights:
+            support = guess > 1e-9
+            key = support.tobytes()
+            if key not in support_terms:
+                support_terms[key] = _two_fund_terms(mu[support], sigma[np.ix_(support, support)])
+            weights = _frontier_on_support(mu, sigma, support, support_terms[key], target_return)
+
+        if weights is None:
+            result = minimize(
+                _volatility_and_grad,
+                guess,
+                args=(sigma_solve,),
+                jac=True,
+                method='SLSQP',
+                bounds=bounds,
+                constraints=constraints,
+                options={'maxiter': 1000, 'ftol': 1e-9}
+            )
+            if result.success:
+                weights = result.x
+
+        if weights is not None:
+            guess = weights
+            frontier_weights.append(weights)
+
+    if not frontier_weights:
+        return []
+
+    # Returns and vols of every point at once: W @ Σ is one matrix product instead of
+    # a Σw product per point
+    W = np.array(frontier_weights)
+    frontier_returns = W @ mu
+    frontier_vols = np.sqrt(np.einsum('ij,ij->i', W @ sigma, W))
+    return [
+        {
+            'return': ret,
+            'volatility': vol,
+            'weights': weights
+        }
+        for ret, vol, weights in zip(frontier_returns.tolist(), frontier_vols.tolist(), W.tolist())
+    ]
+
+# The optimizers depend only on the mean/covariance, not on the portfolio weights, so
+# re-analyzing the same data (e.g. with different weights) reuses earlier solves.
+# Arrays aren't hashable, so the cache is keyed on their raw bytes.
+def _optimizer_cache_key(mean_returns, cov_matrix):
+    mean = np.ascontiguousarray(mean_returns, dtype=np.float64)
+    cov = np.ascontiguousarray(cov_matrix, dtype=np.float64)
+    return mean.tobytes(), cov.tobytes(), len(mean)
+
+@lru_cache(maxsize=64)
+def _optimize_portfolio_cached(mean_bytes, cov_bytes, n_assets, risk_free_rate, dtype):
+    mean = np.frombuffer(mean_bytes)
+    cov = np.frombuffer(cov_bytes).reshape(n_assets, n_assets)
+    return optimize_portfolio(mean, cov, risk_free_rate, dtype)
+
+@lru_cache(maxsize=64)
+def _efficient_frontier_cached(mean_bytes, cov_bytes, n_assets, num_portfolios, dtype):
+    mean = np.frombuffer(mean_bytes)
+    cov = np.frombuffer(cov_bytes).reshape(n_assets, n_assets)
+    return calculate_efficient_frontier(mean, cov, num_portfolios, dtype)
+
+def analyze_portfolio(df: pd.DataFrame, weights=None, risk_free_rate=0.04, dtype=np.float64, shrink=False):
     """
     Analyze a portfolio of asset returns.
 
@@ -164,233 +498,299 @@ def analyze_portfolio(df: pd.DataFrame, weights=None, risk_free_rate=0.04):
         df (pd.DataFrame): DataFrame with Date index and asset returns as columns.
         weights (list/np.array): Portfolio weights, defaults to equal weighting.
         risk_free_rate (float): Annual risk-free rate (default 0.04 = 4%).
+        dtype (np.dtype): Precision for the return-matrix math and the optimizer objectives
+            (default float64). np.float32 computes the covariance and portfolio series from a
+            half-width copy of the returns, halving the bytes the covariance product reads; a
+            float64 frame is otherwise used without a copy. Results are still float64.
+        shrink (bool): Optimize on a Ledoit-Wolf shrunk covariance instead of the sample
+            covariance (default False). Steadier optimal weights on short histories; the
+            optimal portfolios and frontier then report volatility under the shrunk estimate.
 
     Returns:
-        dict: portfolio and asset-level metrics
+        dict: portfolio and asset-level metrics. Undefined metrics are NaN and the
+        chart series are NumPy arrays; serialize with orjson.OPT_SERIALIZE_NUMPY,
+        which writes NaN as null.
     """
     # Ensure datetime index
     if not pd.api.types.is_datetime64_any_dtype(df.index):
         df.index = pd.to_datetime(df.index)
 
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+
+    return analyze_portfolio_unchecked(df, weights, risk_free_rate, dtype, shrink)
+
+def analyze_portfolio_unchecked(df: pd.DataFrame, weights=None, risk_free_rate=0.04, dtype=np.float64, shrink=False):
+    """
+    Same as analyze_portfolio, for callers that have already validated their input.
+
+    df must have a DatetimeIndex and numeric columns, and weights must be None or a
+    float64 array (as produced by the /analyze upload parser).
+    """
     n_assets = df.shape[1]
     asset_names = df.columns.tolist()
 
-    if weights is None:
+    equal_weight = weights is None
+    if equal_weight:
         weights = np.ones(n_assets) / n_assets
-    weights = np.array(weights)
 
     # Convert annual risk-free rate to daily
-    rf_daily = risk_free_rate / 252
-
-    # Basic stats
-    mean_returns = df.mean()
-    volatilities = df.std()
-    covariance_matrix = df.cov()
-
-    # Portfolio stats
-    port_return = np.dot(mean_returns, weights)
-    port_vol = np.sqrt(np.dot(weights.T, np.dot(covariance_matrix, weights)))
-    sharpe = (port_return - rf_daily) / port_vol if port_vol > 0 else np.nan
+    rf_daily = risk_free_rate / _TRADING_DAYS
+
+    # Basic and portfolio stats, computed on one contiguous buffer
+    X = np.ascontiguousarray(df.to_numpy(dtype=dtype))
+    w = weights.astype(dtype, copy=False)
+    mean, vol, cov, port_return, port_vol, sharpe = _portfolio_stats(X, w, rf_daily, equal_weight)
+    has_gaps = bool(np.isnan(X).any())
+    if has_gaps:
+        # pandas' NaN-skipping mean/std and pairwise-complete covariance
+        mean = df.mean().to_numpy(dtype=np.float64)
+        vol = df.std().to_numpy(dtype=np.float64)
+        cov = df.cov().to_numpy(dtype=np.float64)
+        port_return = mean @ weights
+        port_vol = np.sqrt(weights @ cov @ weights)
+        sharpe = (port_return - rf_daily) / port_vol if port_vol > 0 else np.nan
+    port_return = float(port_return)
+    port_vol = float(port_vol)
+    sharpe = float(sharpe)
+
+    # Everything downstream works on the small per-asset results in float64
+    mean = mean.astype(np.float64, copy=False)
+    vol = vol.astype(np.float64, copy=False)
+    cov = cov.astype(np.float64, copy=False)
 
     # Annualize (assuming ~252 trading days)
-    ann_factor = np.sqrt(252)
-    ann_return = port_return * 252
-    ann_vol = port_vol * ann_factor
+    ann_return = port_return * _TRADING_DAYS
+    ann_vol = port_vol * _ANN_FACTOR
     ann_sharpe = (ann_return - risk_free_rate) / ann_vol if ann_vol > 0 else np.nan
 
-    # Calculate portfolio returns series for advanced metrics
-    portfolio_returns = df.dot(weights)
+    # Calculate portfolio returns series for advanced metrics. The time series below are
+    # all derived from X; with a narrower dtype only these 1-D results are widened, so no
+    # second full-width copy of the returns is made.
+    portfolio_returns_arr = (X @ w).astype(np.float64, copy=False)
+    portfolio_returns = pd.Series(portfolio_returns_arr, index=df.index)
 
     # Time-series data for charts
     # 1. Cumulative portfolio value (start at 100)
-    cumulative_returns = (1 + portfolio_returns).cumprod()
-    portfolio_value_series = (cumulative_returns * 100).tolist()
+    # The running peak is computed once here and shared by the drawdown series and max drawdown
+    cumulative_returns, drawdown = _drawdown_path(portfolio_returns_arr)
+    portfolio_value_series = cumulative_returns * 100
     dates_series = df.index.strftime('%Y-%m-%d').tolist()
 
     # 2. Rolling Sharpe ratio (90-day window)
     rolling_window = 90
     rolling_sharpe_series = []
     if len(portfolio_returns) >= rolling_window:
-        for i in range(rolling_window - 1, len(portfolio_returns)):
-            window_returns = portfolio_returns.iloc[i - rolling_window + 1:i + 1]
-            window_mean = window_returns.mean()
-            window_std = window_returns.std()
-            if window_std > 0:
-                window_sharpe = ((window_mean - rf_daily) / window_std) * np.sqrt(252)
-                rolling_sharpe_series.append({
-                    'date': dates_series[i],
-                    'sharpe': window_sharpe
-                })
+        # One O(N) rolling pass instead of re-slicing every window
+        roll_mean, roll_std = _rolling_mean_std(portfolio_returns_arr, rolling_window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roll_sharpe = ((roll_mean - rf_daily) / roll_std) * _ANN_FACTOR
+        rolling_sharpe_series = [
+            {'date': date, 'sharpe': window_sharpe}
+            for date, window_std, window_sharpe in zip(
+                dates_series[rolling_window - 1:], roll_std.tolist(), roll_sharpe.tolist()
+            )
+            if window_std > 0
+        ]
 
     # 3. Drawdown series
-    running_max = cumulative_returns.expanding().max()
-    drawdown_series = ((cumulative_returns - running_max) / running_max * 100).tolist()
+    drawdown_series = drawdown * 100
 
     # 4. Asset-level cumulative returns (for asset view)
-    asset_cumulative_returns = {}
-    for asset in asset_names:
-        asset_cumulative = (1 + df[asset]).cumprod()
-        asset_cumulative_returns[asset] = (asset_cumulative * 100).tolist()
+    # Stored asset-major so each asset's curve is a contiguous row
+    if has_gaps:
+        asset_cumulative = np.ascontiguousarray(((1.0 + df.astype(np.float64)).cumprod() * 100).to_numpy().T)
+    else:
+        # Accumulated in place in one asset-major float64 buffer, which is the output itself
+        asset_cumulative = np.empty((n_assets, len(X)))
+        np.add(X.T, 1.0, out=asset_cumulative)
+        np.cumprod(asset_cumulative, axis=1, out=asset_cumulative)
+        asset_cumulative *= 100
+    asset_cumulative_returns = dict(zip(asset_names, asset_cumulative))
 
     # Tier 1: Advanced Risk Metrics
-    max_drawdown = calculate_max_drawdown(portfolio_returns)
-    sortino_daily = calculate_sortino_ratio(portfolio_returns, rf_daily)
-    sortino_annual = calculate_sortino_ratio(portfolio_returns, rf_daily) * np.sqrt(252)
+    max_drawdown = float(np.nanmin(drawdown))
+    sortino_daily = float(_sortino(portfolio_returns_arr, rf_daily))
+    sortino_annual = sortino_daily * _ANN_FACTOR
 
     # Calculate beta vs market (if SPY is in the portfolio, use it as benchmark)
     beta = np.nan
     if 'SPY' in df.columns:
-        beta = calculate_beta(portfolio_returns, df['SPY'])
-
-    # Correlation matrix
-    correlation_matrix = df.corr()
-    correlation_matrix_dict = correlation_matrix.to_dict()
-
-    # Extract top correlations (excluding diagonal)
-    top_correlations = []
-    for i, asset1 in enumerate(asset_names):
-        for j, asset2 in enumerate(asset_names):
-            if i < j:  # Only upper triangle to avoid duplicates
-                corr = correlation_matrix.loc[asset1, asset2]
-                top_correlations.append({
-                    'asset1': asset1,
-                    'asset2': asset2,
-                    'correlation': corr
-                })
-
-    # Sort by absolute correlation value (highest first)
-    top_correlations.sort(key=lambda x: abs(x['correlation']), reverse=True)
-    top_5_correlations = top_correlations[:5]  # Keep top 5
+        beta = calculate_beta(portfolio_returns_arr, X[:, asset_names.index('SPY')])
+
+    # Correlation matrix, scaled from the covariance computed above; pandas is only used
+    # when the data has gaps (it then correlates pairwise-complete observations)
+    if not has_gaps:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation_matrix = np.clip(cov / np.outer(vol, vol), -1.0, 1.0)
+        np.fill_diagonal(correlation_matrix, np.where(vol > 0, 1.0, np.nan))
+    else:
+        correlation_matrix = df.corr().to_numpy()
+    # Nested {column: {row: value}} dict built from plain lists (same shape as .to_dict())
+    correlation_matrix_dict = {
+        col: dict(zip(asset_names, values))
+        for col, values in zip(asset_names, correlation_matrix.T.tolist())
+    }
+
+    # Extract top correlations (excluding diagonal) from the upper triangle, strongest first;
+    # the stable sort keeps row-major order among ties
+    iu_i, iu_j = np.triu_indices(n_assets, k=1)
+    pair_corrs = correlation_matrix[iu_i, iu_j]
+    order = np.argsort(-np.abs(pair_corrs), kind='stable')[:5]  # Keep top 5
+    top_5_correlations = [
+        {
+            'asset1': asset_names[i],
+            'asset2': asset_names[j],
+            'correlation': corr
+        }
+        for i, j, corr in zip(iu_i[order].tolist(), iu_j[order].tolist(), pair_corrs[order].tolist())
+    ]
 
     # Diversification ratio: weighted avg volatility / portfolio volatility
-    weighted_vols = np.dot(volatilities, weights)
+    weighted_vols = np.dot(vol, weights)
     diversification_ratio = weighted_vols / port_vol if port_vol > 0 else np.nan
 
     # Tier 2: Portfolio Optimization (pass daily risk-free rate)
-    optimal_portfolios = optimize_portfolio(mean_returns, covariance_matrix, rf_daily)
-    efficient_frontier = calculate_efficient_frontier(mean_returns, covariance_matrix, num_portfolios=20)
-
-    # Annualize frontier points
-    efficient_frontier_annual = []
-    for point in efficient_frontier:
-        efficient_frontier_annual.append({
-            'return': point['return'] * 252,
-            'volatility': point['volatility'] * np.sqrt(252),
+    # Cached results are shared, so the caller gets its own copy
+    optimizer_cov = shrink_covariance(cov, ledoit_wolf_shrinkage(X)) if shrink else cov
+    optimizer_key = _optimizer_cache_key(mean, optimizer_cov)
+    solver_dtype = np.dtype(dtype)
+    optimal_portfolios = copy.deepcopy(_optimize_portfolio_cached(*optimizer_key, rf_daily, solver_dtype))
+    efficient_frontier = copy.deepcopy(_efficient_frontier_cached(*optimizer_key, 20, solver_dtype))
+
+    # Annualize frontier points as two array multiplies, then repack the dicts
+    frontier_returns = np.fromiter((point['return'] for point in efficient_frontier), float) * _TRADING_DAYS
+    frontier_vols = np.fromiter((point['volatility'] for point in efficient_frontier), float) * _ANN_FACTOR
+    efficient_frontier_annual = [
+        {
+            'return': ret,
+            'volatility': vol_point,
             'weights': point['weights']
-        })
+        }
+        for ret, vol_point, point in zip(frontier_returns.tolist(), frontier_vols.tolist(), efficient_frontier)
+    ]
 
     # Annualize optimal portfolios
     optimal_portfolios_annual = {
         'min_variance': {
             'weights': optimal_portfolios['min_variance']['weights'],
-            'return': optimal_portfolios['min_variance']['return'] * 252,
-            'volatility': optimal_portfolios['min_variance']['volatility'] * np.sqrt(252),
-            'sharpe': optimal_portfolios['min_variance']['sharpe'] * np.sqrt(252)
+            'return': optimal_portfolios['min_variance']['return'] * _TRADING_DAYS,
+            'volatility': optimal_portfolios['min_variance']['volatility'] * _ANN_FACTOR,
+            'sharpe': optimal_portfolios['min_variance']['sharpe'] * _ANN_FACTOR
         },
         'max_sharpe': {
             'weights': optimal_portfolios['max_sharpe']['weights'],
-            'return': optimal_portfolios['max_sharpe']['return'] * 252,
-            'volatility': optimal_portfolios['max_sharpe']['volatility'] * np.sqrt(252),
-            'sharpe': optimal_portfolios['max_sharpe']['sharpe'] * np.sqrt(252)
+            'return': optimal_portfolios['max_sharpe']['return'] * _TRADING_DAYS,
+            'volatility': optimal_portfolios['max_sharpe']['volatility'] * _ANN_FACTOR,
+            'sharpe': optimal_portfolios['max_sharpe']['sharpe'] * _ANN_FACTOR
         }
     }
 
     # Windowed metrics (quarterly)
-    # Calculate metrics for each quarter to show trends
-    windowed_metrics = []
-
-    # Group by quarter
-    df_with_quarter = df.copy()
-    df_with_quarter['quarter'] = df_with_quarter.index.to_period('Q')
-
-    for quarter in df_with_quarter['quarter'].unique():
-        quarter_data = df_with_quarter[df_with_quarter['quarter'] == quarter].drop('quarter', axis=1)
-
-        if len(quarter_data) >= 20:  # Need at least 20 days for meaningful stats
-            q_mean_returns = quarter_data.mean()
-            q_cov = quarter_data.cov()
-
-            q_port_return = np.dot(q_mean_returns, weights)
-            q_port_vol = np.sqrt(np.dot(weights.T, np.dot(q_cov, weights)))
-
-            # Annualize
-            q_ann_return = q_port_return * 252
-            q_ann_vol = q_port_vol * np.sqrt(252)
-            q_ann_sharpe = (q_ann_return - risk_free_rate) / q_ann_vol if q_ann_vol > 0 else None
-
-            windowed_metrics.append({
-                'quarter': str(quarter),
-                'return': q_ann_return,
-                'volatility': q_ann_vol,
-                'sharpe': q_ann_sharpe,
-                'days': len(quarter_data)
-            })
+    # Calculate metrics for each quarter to show trends.
+    # A quarter's w'Σw is just the variance of the portfolio's daily returns over that
+    # quarter, so one groupby on the 1-D portfolio returns replaces per-quarter covariances.
+    quarters = df.index.to_period('Q')
+    if has_gaps:
+        # pandas skips NaNs per asset, so the identity doesn't hold with gaps; use each
+        # quarter's mean and pairwise covariance, counting every day of the quarter
+        grouped = df.groupby(quarters, sort=False)
+        q_means = grouped.mean()
+        q_vars = [weights @ group.cov().to_numpy() @ weights for _, group in grouped]
+        quarterly = pd.DataFrame(
+            {'mean': q_means.to_numpy() @ weights, 'std': np.sqrt(q_vars), 'count': grouped.size().to_numpy()},
+            index=q_means.index,
+        )
+    else:
+        quarterly = portfolio_returns.groupby(quarters, sort=False).agg(['mean', 'std', 'count'])
+    quarterly = quarterly[quarterly['count'] >= 20]  # Need at least 20 days for meaningful stats
+
+    # Annualize
+    q_ann_returns = quarterly['mean'].to_numpy() * _TRADING_DAYS
+    q_ann_vols = quarterly['std'].to_numpy() * _ANN_FACTOR
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q_ann_sharpes = (q_ann_returns - risk_free_rate) / q_ann_vols
+
+    windowed_metrics = [
+        {
+            'quarter': str(quarter),
+            'return': q_ann_return,
+            'volatility': q_ann_vol,
+            'sharpe': q_ann_sharpe if q_ann_vol > 0 else None,
+            'days': q_days
+        }
+        for quarter, q_ann_return, q_ann_vol, q_ann_sharpe, q_days in zip(
+            quarterly.index, q_ann_returns.tolist(), q_ann_vols.tolist(),
+            q_ann_sharpes.tolist(), quarterly['count'].tolist()
+        )
+    ]
 
     # Asset-level metrics
     # Per-asset contribution to portfolio return
-    asset_return_contributions = (mean_returns * weights * 252).to_dict()
+    asset_return_contributions = dict(zip(asset_names, (mean * weights * _TRADING_DAYS).tolist()))
 
     # Per-asset contribution to portfolio variance (using marginal contribution)
     # MCR = (Covariance Matrix * weights) / portfolio_variance
-    marginal_contrib = covariance_matrix.dot(weights) / (port_vol ** 2) if port_vol > 0 else np.zeros(n_assets)
-    asset_variance_contributions = (marginal_contrib * weights * 252).tolist()
+    marginal_contrib = cov @ weights / (port_vol ** 2) if port_vol > 0 else np.zeros(n_assets)
+    asset_variance_contributions = (marginal_contrib * weights * _TRADING_DAYS).tolist()
 
     # Per-asset Sharpe ratio (individual asset Sharpe, not contribution)
-    asset_sharpes = {}
-    for asset in asset_names:
-        asset_return_annual = mean_returns[asset] * 252
-        asset_vol_annual = volatilities[asset] * np.sqrt(252)
-        if asset_vol_annual > 0:
-            asset_sharpes[asset] = (asset_return_annual - risk_free_rate) / asset_vol_annual
-        else:
-            asset_sharpes[asset] = None
-
-    # Convert NaN/Inf to None for JSON serialization
-    def clean_value(val):
-        if isinstance(val, (int, float)):
-            if np.isnan(val) or np.isinf(val):
-                return None
-        return val
-
+    asset_returns_annual = mean * _TRADING_DAYS
+    asset_vols_annual = vol * _ANN_FACTOR
+    # Zero-vol assets get NaN, serialized as null
+    asset_sharpe_values = (asset_returns_annual - risk_free_rate) / np.where(asset_vols_annual > 0, asset_vols_annual, np.nan)
+    asset_sharpes = dict(zip(asset_names, asset_sharpe_values.tolist()))
+
+    # Undefined values stay NaN and the time series stay NumPy arrays; the backend
+    # serializes with orjson, which writes NaN/Inf as null
     return {
         # Original metrics
-        "asset_means": mean_returns.to_dict(),
-        "asset_vols": volatilities.to_dict(),
-        "portfolio_return_daily": clean_value(port_return),
-        "portfolio_vol_daily": clean_value(port_vol),
-        "portfolio_sharpe_daily": clean_value(sharpe),
-        "portfolio_return_annual": clean_value(ann_return),
-        "portfolio_vol_annual": clean_value(ann_vol),
-        "portfolio_sharpe_annual": clean_value(ann_sharpe),
+        "asset_means": dict(zip(asset_names, mean.tolist())),
+        "asset_vols": dict(zip(asset_names, vol.tolist())),
+        # The same daily means/vols as arrays aligned with asset_names, for vectorized use
+        "asset_names": asset_names,
+        "asset_mu": mean,
+        "asset_sigma": vol,
+        "portfolio_return_daily": port_return,
+        "portfolio_vol_daily": port_vol,
+        "portfolio_sharpe_daily": sharpe,
+        "portfolio_return_annual": ann_return,
+        "portfolio_vol_annual": ann_vol,
+        "portfolio_sharpe_annual": ann_sharpe,
 
         # Tier 1: Advanced Risk Metrics
-        "max_drawdown": clean_value(max_drawdown),
-        "sortino_ratio_daily": clean_value(sortino_daily),
-        "sortino_ratio_annual": clean_value(sortino_annual),
-        "beta": clean_value(beta),
+        "max_drawdown": max_drawdown,
+        "sortino_ratio_daily": sortino_daily,
+        "sortino_ratio_annual": sortino_annual,
+        "beta": float(beta),
         "correlation_matrix": correlation_matrix_dict,
-        "top_correlations": [{k: clean_value(v) if k == 'correlation' else v for k, v in corr.items()} for corr in top_5_correlations],
-        "diversification_ratio": clean_value(diversification_ratio),
+        "top_correlations": top_5_correlations,
+        # Every upper-triangle pair as parallel arrays; asset1/asset2 index asset_names
+        "correlation_pairs": {"asset1": iu_i, "asset2": iu_j, "correlation": pair_corrs},
+        "diversification_ratio": float(diversification_ratio),
 
         # Asset-level metrics
-        "asset_weights": {asset: weight for asset, weight in zip(asset_names, weights)},
-        "asset_return_contributions": {k: clean_value(v) for k, v in asset_return_contributions.items()},
-        "asset_variance_contributions": {asset: clean_value(contrib) for asset, contrib in zip(asset_names, asset_variance_contributions)},
-        "asset_sharpes": {k: clean_value(v) for k, v in asset_sharpes.items()},
+        "asset_weights": dict(zip(asset_names, weights.tolist())),
+        "asset_return_contributions": asset_return_contributions,
+        "asset_variance_contributions": dict(zip(asset_names, asset_variance_contributions)),
+        "asset_sharpes": asset_sharpes,
 
         # Windowed metrics
-        "windowed_metrics": [{k: clean_value(v) if k != 'quarter' and k != 'days' else v for k, v in window.items()} for window in windowed_metrics],
+        "windowed_metrics": windowed_metrics,
 
         # Time-series data for charts
         "time_series": {
             "dates": dates_series,
-            "portfolio_value": [clean_value(v) for v in portfolio_value_series],
-            "rolling_sharpe": [{k: clean_value(v) if k != 'date' else v for k, v in point.items()} for point in rolling_sharpe_series],
-            "drawdown": [clean_value(v) for v in drawdown_series],
-            "asset_values": {asset: [clean_value(v) for v in values] for asset, values in asset_cumulative_returns.items()}
+            "portfolio_value": portfolio_value_series,
+            "rolling_sharpe": rolling_sharpe_series,
+            "drawdown": drawdown_series,
+            "asset_values": asset_cumulative_returns
         },
 
         # Tier 2: Portfolio Optimization
         "optimal_portfolios": optimal_portfolios_annual,
         "efficient_frontier": efficient_frontier_annual,
+        # The frontier's annualized returns and vols as arrays, in the same order
+        "frontier_returns": frontier_returns,
+        "frontier_vols": frontier_vols,
     }
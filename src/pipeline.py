@@ -1,128 +1,437 @@
+import asyncio
+import copy
+import hashlib
+import io
+import logging
+import multiprocessing
 import os
-#from langchain_community.document_loaders import PyMuPDFLoader
+import random
+import re
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+import orjson
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
+from openai import AsyncOpenAI, RateLimitError
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 from langchain.chains import RetrievalQA
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain_community.document_loaders import UnstructuredPDFLoader
+from langchain_community.document_loaders import PyMuPDFLoader, UnstructuredPDFLoader
 from langchain_core.retrievers import BaseRetriever
-from langchain_core.callbacks import CallbackManagerForRetrieverRun
-from typing import List
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from typing import List, Optional
+from pydantic import PrivateAttr
 from langchain_core.documents import Document
 
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pypdfium2 is optional; PDFs are then partitioned whole
+    pdfium = None
+
+logger = logging.getLogger(__name__)
 
 
 # --- CONFIG ---
 COLLECTION_NAME = "fincanon_papers"
+EMBEDDING_MODEL = "text-embedding-3-large"
+# Embedding requests in flight at once during ingestion
+EMBED_CONCURRENCY = 5
+# Answers generated at once by batch_query_fincanon
+LLM_CONCURRENCY = 5
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", None)
+# gRPC (port 6334) is opt-in: the local docker setup only publishes the HTTP port
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "").lower() in ("1", "true", "yes")
+# SQLite file persisting query embeddings across runs (e.g. repeated RAG test runs);
+# unset or empty disables it, so the backend never grows an unbounded file by default
+QUERY_EMBEDDING_CACHE = os.getenv("QUERY_EMBEDDING_CACHE", "")
+
+# Below this many extracted characters per page a PDF is treated as scanned/image-based
+MIN_TEXT_CHARS_PER_PAGE = 200
+# Consecutive same-page chunks are merged while their combined length stays under
+# half the splitter's chunk_size; chunks with fewer word characters are not embedded
+MERGE_BELOW_CHARS = 1000
+MIN_CHUNK_WORD_CHARS = 50
+
+_WORD_CHAR_RE = re.compile(r"\w")
 
 # Make sure your OPENAI_API_KEY is set as env var
 # export OPENAI_API_KEY="sk-..."
 
-def ingest_pdf(pdf_path: str, doc_title: str):
-    """Load, chunk, embed, and store a PDF into Qdrant."""
-    # 1. Load PDF
-    # Option A: Use UnstructuredPDFLoader with mode='elements' to get page_number
-    loader = UnstructuredPDFLoader(pdf_path, mode="elements")
-    docs = loader.load()
+def _partition_page(args) -> List[Document]:
+    """Partition one single-page PDF into element Documents (runs in a worker process)."""
+    from unstructured.partition.pdf import partition_pdf
+
+    page_bytes, page_number, pdf_path = args
+    elements = partition_pdf(file=io.BytesIO(page_bytes))
+    docs = []
+    for element in elements:
+        metadata = element.metadata.to_dict()
+        metadata.update(source=pdf_path, page_number=page_number, category=element.category)
+        docs.append(Document(page_content=str(element), metadata=metadata))
+    return docs
+
+def _split_pages(pdf_path: str) -> List[bytes]:
+    """Write each page of a PDF out as its own single-page PDF."""
+    pdf = pdfium.PdfDocument(pdf_path)
+    pages = []
+    try:
+        for i in range(len(pdf)):
+            page_pdf = pdfium.PdfDocument.new()
+            page_pdf.import_pages(pdf, [i])
+            buf = io.BytesIO()
+            page_pdf.save(buf)
+            page_pdf.close()
+            pages.append(buf.getvalue())
+    finally:
+        pdf.close()
+    return pages
+
+def _partition_pool(max_workers: int = None) -> ProcessPoolExecutor:
+    """Process pool for _partition_page; spawn rather than fork, since callers use threads."""
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=ctx)
+
+def _partition_pdf(pdf_path: str, pool: ProcessPoolExecutor = None) -> List[Document]:
+    """Partition a PDF into element Documents with 1-indexed page_number metadata.
+
+    Layout analysis is CPU-bound per page, so when pypdfium2 is available the PDF is
+    split into single pages that are partitioned in a process pool: the caller's pool
+    if given (ingest_pdfs shares one across papers), else a temporary one. Otherwise
+    the whole file goes through UnstructuredPDFLoader in this process.
+    """
+    if pdfium is None:
+        return UnstructuredPDFLoader(pdf_path, mode="elements").load()
+
+    pages = _split_pages(pdf_path)
+    args = [(page, i + 1, pdf_path) for i, page in enumerate(pages)]
+    if len(args) <= 1:
+        per_page = [_partition_page(a) for a in args]
+    elif pool is not None:
+        per_page = list(pool.map(_partition_page, args))
+    else:
+        with _partition_pool() as own_pool:
+            per_page = list(own_pool.map(_partition_page, args))
+    return [doc for page_docs in per_page for doc in page_docs]
 
-    # Option B (alternative): Use PyMuPDFLoader which extracts page numbers as 'page' (0-indexed)
-    # from langchain_community.document_loaders import PyMuPDFLoader
-    # loader = PyMuPDFLoader(pdf_path)
-    # docs = loader.load()
+def load_pdf_chunks(pdf_path: str, doc_title: str, pool: ProcessPoolExecutor = None) -> List[Document]:
+    """Load a PDF and split it into chunks with normalized title/page/source metadata.
 
-    # 2. Split into chunks
-    splitter = RecursiveCharacterTextSplitter(
-    chunk_size=2000,
-    chunk_overlap=250,
-    separators=["\n\n", "\n", " ", ""]
-)
-    chunks = splitter.split_documents(docs)
-
-    # 3. Normalize metadata to extract page numbers consistently
+    pool, if given, is the process pool used to partition text-poor PDFs page by page.
+    """
+    # 1. Load PDF
+    # Born-digital papers have a clean text layer: PyMuPDFLoader reads it directly
+    # (page numbers as 'page', 0-indexed) without Unstructured's layout/OCR pipeline
+    try:
+        docs = PyMuPDFLoader(pdf_path).load()
+    except ImportError as e:  # pymupdf not installed
+        logger.warning("PyMuPDF unavailable (%s); partitioning %s with Unstructured instead", e, pdf_path)
+        docs = []
+    avg_chars = sum(len(d.page_content) for d in docs) / max(1, len(docs))
+
+    # Scanned or otherwise text-poor PDFs fall back to Unstructured (elements mode),
+    # which reports 'page_number' (1-indexed)
+    if avg_chars < MIN_TEXT_CHARS_PER_PAGE:
+        docs = _partition_pdf(pdf_path, pool)
+
+    # Page numbers, running headers and footers come through as tiny fragments:
+    # fold them into their neighbours, then skip whatever is still too short to be worth embedding
+    chunks = _merge_fragments(_iter_chunks(docs, pdf_path, doc_title))
+    return [chunk for chunk in chunks if len(_WORD_CHAR_RE.findall(chunk.page_content)) >= MIN_CHUNK_WORD_CHARS]
+
+def _merge_fragments(chunks):
+    """Merge consecutive chunks from the same page while they stay under MERGE_BELOW_CHARS."""
+    pending = None
     for chunk in chunks:
-        # UnstructuredPDFLoader with mode='elements' uses 'page_number' (1-indexed)
-        # PyMuPDFLoader uses 'page' (0-indexed)
-        page_num = chunk.metadata.get("page_number") or chunk.metadata.get("page")
-
-        # Convert to 1-indexed if using PyMuPDFLoader (which is 0-indexed)
-        if "page" in chunk.metadata and "page_number" not in chunk.metadata:
-            page_num = page_num + 1 if page_num is not None else None
-
-        chunk.metadata = {
-            "title": doc_title,
-            "page": page_num,
-            "source": chunk.metadata.get("source", pdf_path)
-        }
+        if (
+            pending is not None
+            and chunk.metadata["page"] == pending.metadata["page"]
+            and len(pending.page_content) + len(chunk.page_content) < MERGE_BELOW_CHARS
+        ):
+            pending.page_content = pending.page_content + "\n\n" + chunk.page_content
+            continue
+        if pending is not None:
+            yield pending
+        pending = chunk
+    if pending is not None:
+        yield pending
+
+@lru_cache(maxsize=1)
+def _splitter():
+    """Text splitter shared by every document instead of rebuilt per PDF.
+
+    Lengths are in characters: 2000-character chunks are roughly 500 tokens, far
+    below the embedding model's 8191-token input limit.
+    """
+    return RecursiveCharacterTextSplitter(
+        chunk_size=2000,
+        chunk_overlap=250,
+        separators=["\n\n", "\n", " ", ""]
+    )
 
-    # 4. Embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+def _iter_chunks(docs: List[Document], pdf_path: str, doc_title: str):
+    """Split documents one at a time and yield chunks with normalized metadata.
 
-    # 5. Qdrant client
-    if QDRANT_API_KEY:
-        qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-    else:
-        qdrant_client = QdrantClient(QDRANT_URL)
+    Each chunk is normalized as it is produced, rather than splitting everything
+    first and walking the full chunk list a second time.
+    """
+    # 2. Split into chunks
+    splitter = _splitter()
+    for doc in docs:
+        for chunk in splitter.split_documents([doc]):
+            # 3. Normalize metadata to extract page numbers consistently
+            # UnstructuredPDFLoader with mode='elements' uses 'page_number' (1-indexed)
+            # PyMuPDFLoader uses 'page' (0-indexed)
+            page_num = chunk.metadata.get("page_number") or chunk.metadata.get("page")
+
+            # Convert to 1-indexed if using PyMuPDFLoader (which is 0-indexed)
+            if "page" in chunk.metadata and "page_number" not in chunk.metadata:
+                page_num = page_num + 1 if page_num is not None else None
+
+            # Rewrite the chunk's own dict in place (the splitter gives each chunk a copy)
+            source = chunk.metadata.get("source", pdf_path)
+            chunk.metadata.clear()
+            chunk.metadata["title"] = doc_title
+            chunk.metadata["page"] = page_num
+            chunk.metadata["source"] = source
+            yield chunk
+
+async def _embed_texts(texts: List[str], batch_size: int = 256, max_concurrency: int = EMBED_CONCURRENCY,
+                       max_retries: int = 6) -> List[List[float]]:
+    """Embed texts in batches, sending up to max_concurrency requests at once.
+
+    Rate-limited (429) requests are retried with exponential backoff and jitter.
+    Vectors are returned in the same order as texts.
+    """
+    client = AsyncOpenAI()
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def embed_batch(sub):
+        async with sem:
+            for attempt in range(max_retries):
+                try:
+                    r = await client.embeddings.create(model=EMBEDDING_MODEL, input=sub)
+                    return [d.embedding for d in r.data]
+                except RateLimitError:
+                    if attempt == max_retries - 1:
+                        raise
+                    await asyncio.sleep(2 ** attempt + random.random())
 
-    # Check if collection exists
     try:
-        qdrant_client.get_collection("fincanon_papers")
-        collection_exists = True
-    except:
-        collection_exists = False
+        # gather returns results in submission order, so batches reassemble in place
+        batches = await asyncio.gather(*[
+            embed_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+        ])
+    finally:
+        await client.close()
+
+    return [vector for batch in batches for vector in batch]
+
+def _point_id(text: str, source: str) -> str:
+    """Deterministic Qdrant point ID (a UUID) for a chunk's text within its source PDF."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(source.encode())
+    digest.update(b"\0")
+    digest.update(text.encode())
+    return str(uuid.UUID(bytes=digest.digest()))
+
+def _store_chunks(chunks: List[Document], batch_size: int = 256, upsert_batch_size: int = 512):
+    """Embed chunks and upsert them into Qdrant, creating the collection if needed.
+
+    Chunks are processed in windows of EMBED_CONCURRENCY embedding batches: each
+    window's requests run concurrently, its vectors are upserted directly, and then
+    they are dropped, so only one window of 3072-dim vectors is held at a time.
+    Payloads use the same page_content/metadata layout as QdrantVectorStore so the
+    retriever reads them back unchanged.
 
+    Args:
+        chunks: Documents to store
+        batch_size: Texts per embedding request
+        upsert_batch_size: Points per Qdrant upsert
+    """
+    if not chunks:
+        return
+
+    # 5. Qdrant client
+    qdrant_client = _qdrant_client()
+    collection_exists = qdrant_client.collection_exists(COLLECTION_NAME)
     if collection_exists:
-        # Add to existing collection
-        if QDRANT_API_KEY:
-            qdrant = QdrantVectorStore.from_existing_collection(
-                embedding=embeddings,
-                url=QDRANT_URL,
-                api_key=QDRANT_API_KEY,
-                collection_name="fincanon_papers"
-            )
-        else:
-            qdrant = QdrantVectorStore.from_existing_collection(
-                embedding=embeddings,
-                url=QDRANT_URL,
-                collection_name="fincanon_papers"
-            )
         print(f"Adding {len(chunks)} chunks to existing collection...")
-        try:
-            qdrant.add_documents(chunks)
-            print(f"✅ Successfully added {len(chunks)} chunks")
-        except Exception as e:
-            print(f"❌ Error adding documents: {e}")
-            raise
     else:
-        # Create new collection
         print(f"Creating new collection with {len(chunks)} chunks...")
-        try:
-            if QDRANT_API_KEY:
-                qdrant = QdrantVectorStore.from_documents(
-                    chunks,
-                    embeddings,
-                    url=QDRANT_URL,
-                    api_key=QDRANT_API_KEY,
-                    collection_name="fincanon_papers"
+
+    window = batch_size * EMBED_CONCURRENCY
+    try:
+        for start in range(0, len(chunks), window):
+            window_chunks = chunks[start:start + window]
+            texts = [chunk.page_content for chunk in window_chunks]
+
+            # 4. Embeddings
+            vectors = asyncio.run(_embed_texts(texts, batch_size))
+
+            if not collection_exists:
+                # Full-precision vectors live on disk; int8 quantized copies stay in RAM for the
+                # search itself (about 4x less memory than float32 for 3072-dim embeddings)
+                qdrant_client.create_collection(
+                    collection_name=COLLECTION_NAME,
+                    vectors_config=models.VectorParams(
+                        size=len(vectors[0]), distance=models.Distance.COSINE, on_disk=True
+                    ),
+                    hnsw_config=models.HnswConfigDiff(m=32, ef_construct=256),
+                    quantization_config=models.ScalarQuantization(
+                        scalar=models.ScalarQuantizationConfig(
+                            type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                        )
+                    )
                 )
-            else:
-                qdrant = QdrantVectorStore.from_documents(
-                    chunks,
-                    embeddings,
-                    url=QDRANT_URL,
-                    collection_name="fincanon_papers"
+                collection_exists = True
+
+            # Point IDs derive from the source and chunk text, so re-ingesting a paper
+            # overwrites its points instead of adding duplicates, while identical text in
+            # two papers keeps each paper's own title/page metadata
+            points = [
+                models.PointStruct(
+                    id=_point_id(chunk.page_content, str(chunk.metadata.get("source", ""))),
+                    vector=vector,
+                    payload={"page_content": chunk.page_content, "metadata": chunk.metadata}
                 )
-            print(f"✅ Successfully created collection with {len(chunks)} chunks")
-        except Exception as e:
-            print(f"❌ Error creating collection: {e}")
-            raise
+                for chunk, vector in zip(window_chunks, vectors)
+            ]
+            for i in range(0, len(points), upsert_batch_size):
+                qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points[i:i + upsert_batch_size])
+        print(f"✅ Successfully added {len(chunks)} chunks")
+    except Exception as e:
+        print(f"❌ Error adding documents: {e}")
+        raise
 
+def ingest_pdf(pdf_path: str, doc_title: str):
+    """Load, chunk, embed, and store a PDF into Qdrant."""
+    chunks = load_pdf_chunks(pdf_path, doc_title)
+    _store_chunks(chunks)
     print(f"✅ Ingested {len(chunks)} chunks from {doc_title} into Qdrant")
 
+def ingest_pdfs(paths_and_titles: list, batch_size: int = 256, max_workers: int = 4) -> dict:
+    """Load and chunk several PDFs, then embed and store all their chunks in one batched upload.
+
+    Sending every paper's chunks through a single upload means large embedding
+    requests and one collection check instead of a round of HTTP calls per paper.
+
+    Args:
+        paths_and_titles: List of (pdf_path, doc_title) tuples
+        batch_size: Chunks per embedding request and Qdrant upsert
+        max_workers: Number of PDFs to load and chunk concurrently
+
+    Returns:
+        Dict mapping pdf_path to the exception raised while loading it, for papers
+        that were skipped. Errors while storing the chunks are raised.
+    """
+    all_chunks = []
+    failed = {}
+
+    # PDF parsing is independent per paper, so it runs concurrently. Papers that need
+    # page-by-page partitioning share one process pool, so at most cpu_count worker
+    # processes (each loading Unstructured's layout models once) run in total.
+    # Its workers are only spawned if some paper actually needs it.
+    with _partition_pool() as pool, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(load_pdf_chunks, pdf_path, doc_title, pool): (pdf_path, doc_title)
+            for pdf_path, doc_title in paths_and_titles
+        }
+        for future in as_completed(futures):
+            pdf_path, doc_title = futures[future]
+            try:
+                chunks = future.result()
+            except Exception as e:
+                print(f"❌ Error loading {doc_title}: {e}")
+                failed[pdf_path] = e
+                continue
+            print(f"📄 Chunked {doc_title}: {len(chunks)} chunks")
+            all_chunks.extend(chunks)
+
+    if all_chunks:
+        _store_chunks(all_chunks, batch_size=batch_size)
+        print(f"✅ Ingested {len(all_chunks)} chunks from {len(paths_and_titles) - len(failed)} papers into Qdrant")
+
+    return failed
+
+def _format_answer(query: str, result: dict, k: int):
+    """Log the retrieved documents and return (answer, sources) from a QA chain result."""
+    # DEBUG: Log all retrieved documents (skipped entirely unless debug logging is on)
+    if logger.isEnabledFor(logging.DEBUG):
+        lines = [
+            "=" * 80,
+            f"Retrieved {len(result['source_documents'])} documents for query: '{query}'",
+            "=" * 80,
+        ]
+        for i, doc in enumerate(result["source_documents"], 1):
+            lines.append(f"[{i}] {doc.metadata.get('title', 'Unknown')} (Page {doc.metadata.get('page', '?')})")
+            lines.append(f"    Content preview: {doc.page_content[:150]}...")
+        logger.debug("\n".join(lines))
+
+    # Extract answer and format sources
+    answer = result["result"]
+    sources = []
+    for doc in result["source_documents"][:k]:
+        sources.append({
+            "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
+            "metadata": doc.metadata
+        })
+
+    return answer, sources
+
+# Answers are cached per (portfolio context, question, k). A new question whose embedding
+# is nearly identical to a cached question's for the same portfolio reuses that answer too.
+ANSWER_CACHE_MAXSIZE = 256
+ANSWER_CACHE_SIMILARITY = 0.98
+_answer_cache = OrderedDict()  # key -> (unit query vector, answer, sources)
+_answer_cache_lock = threading.Lock()
+
+
+def _answer_cache_get(key):
+    """Return (answer, sources, query_vector); answer and sources are None on a miss."""
+    with _answer_cache_lock:
+        if key in _answer_cache:
+            _answer_cache.move_to_end(key)
+            _, answer, sources = _answer_cache[key]
+            return answer, copy.deepcopy(sources), None
+
+    # Semantic lookup; the query embedding is cached and reused by retrieval on a miss
+    query_vector = np.asarray(_embeddings().embed_query(key[1]))
+    query_vector = query_vector / np.linalg.norm(query_vector)
+    with _answer_cache_lock:
+        candidates = [
+            (cached_key, entry) for cached_key, entry in _answer_cache.items()
+            if cached_key[0] == key[0] and cached_key[2] == key[2]
+        ]
+    if candidates:
+        similarity = np.array([entry[0] for _, entry in candidates]) @ query_vector
+        best = int(np.argmax(similarity))
+        if similarity[best] > ANSWER_CACHE_SIMILARITY:
+            _, answer, sources = candidates[best][1]
+            return answer, copy.deepcopy(sources), query_vector
+    return None, None, query_vector
+
+
+def _answer_cache_put(key, query_vector, answer, sources):
+    with _answer_cache_lock:
+        _answer_cache[key] = (query_vector, answer, copy.deepcopy(sources))
+        _answer_cache.move_to_end(key)
+        if len(_answer_cache) > ANSWER_CACHE_MAXSIZE:
+            _answer_cache.popitem(last=False)
+
+
+def _answer_cache_key(query: str, k: int, portfolio_key: bytes):
+    return (portfolio_key, " ".join(query.split()), k)
+
+
 def query_fincanon(query: str, k: int = 3, portfolio_context: dict = None):
     """Query Qdrant for relevant chunks and generate an answer using LLM.
 
@@ -131,33 +440,123 @@ def query_fincanon(query: str, k: int = 3, portfolio_context: dict = None):
         k: Number of source documents to return
         portfolio_context: Optional dictionary containing portfolio metrics
     """
+    # The context is serialized once, for both the answer cache and the QA chain lookup
+    portfolio_key = _portfolio_key(portfolio_context)
+    key = _answer_cache_key(query, k, portfolio_key)
+    answer, sources, query_vector = _answer_cache_get(key)
+    if answer is not None:
+        return answer, sources
+
     # Build the QA chain with portfolio context
-    qa_chain = build_qa_chain(portfolio_context=portfolio_context)
+    qa_chain = _cached_qa_chain(portfolio_key)
 
     # Get answer with sources
     result = qa_chain.invoke({"query": query})
+    answer, sources = _format_answer(query, result, k)
+    _answer_cache_put(key, query_vector, answer, sources)
+    return answer, sources
 
-    # DEBUG: Print all retrieved documents
-    print("\n" + "="*80)
-    print(f"DEBUG: Retrieved {len(result['source_documents'])} documents for query: '{query}'")
-    print("="*80)
-    for i, doc in enumerate(result["source_documents"], 1):
-        print(f"\n[{i}] {doc.metadata.get('title', 'Unknown')} (Page {doc.metadata.get('page', '?')})")
-        print(f"    Content preview: {doc.page_content[:150]}...")
-    print("\n" + "="*80 + "\n")
+def batch_query_fincanon(questions: list, k: int = 3, portfolio_contexts: list = None) -> list:
+    """Answer several questions, retrieving context for all of them at once.
 
-    # Extract answer and format sources
-    answer = result["result"]
-    sources = []
-    for doc in result["source_documents"][:k]:
-        sources.append({
-            "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-            "metadata": doc.metadata
-        })
+    Every question's query variations are embedded in one request and searched in one
+    Qdrant batch; the LLM then answers the questions concurrently. Cached answers are
+    reused as in query_fincanon.
 
+    Args:
+        questions: The user's questions
+        k: Number of source documents to return per question
+        portfolio_contexts: Optional portfolio metrics dict (or None) per question
+
+    Returns:
+        List of (answer, sources) tuples in the order of questions
+    """
+    if portfolio_contexts is None:
+        portfolio_contexts = [None] * len(questions)
+
+    # One embedding request for all questions; the cache lookups below then hit the
+    # query-embedding cache instead of embedding each question separately
+    _embeddings().embed_queries(questions)
+
+    results = [None] * len(questions)
+    pending = []  # (index, cache key, query vector)
+    portfolio_keys = {}  # Questions about one portfolio share its dict; serialize it once
+    for i, (question, context) in enumerate(zip(questions, portfolio_contexts)):
+        if id(context) not in portfolio_keys:
+            portfolio_keys[id(context)] = _portfolio_key(context)
+        key = _answer_cache_key(question, k, portfolio_keys[id(context)])
+        answer, sources, query_vector = _answer_cache_get(key)
+        if answer is not None:
+            results[i] = (answer, sources)
+        else:
+            pending.append((i, key, query_vector))
+
+    if pending:
+        variations = [expand_query_with_terminology(questions[i]) for i, _, _ in pending]
+        doc_lists = _vectorstore().max_marginal_relevance_search_batch(
+            [v for question_variations in variations for v in question_variations],
+            **RETRIEVER_SEARCH_KWARGS
+        )
+
+        retrieved = []
+        start = 0
+        for question_variations in variations:
+            retrieved.append(MultiQueryRetriever._merge_unique(doc_lists[start:start + len(question_variations)]))
+            start += len(question_variations)
+
+        def answer_one(i, key, docs):
+            # Same prompt and LLM as the question's QA chain, fed the documents retrieved above
+            qa_chain = _cached_qa_chain(key[0])
+            output = qa_chain.combine_documents_chain.invoke(
+                {"input_documents": docs, "question": questions[i]}
+            )
+            return _format_answer(
+                questions[i], {"result": output["output_text"], "source_documents": docs}, k
+            )
+
+        # LLM calls are network-bound, so the questions are answered concurrently
+        with ThreadPoolExecutor(max_workers=min(len(pending), LLM_CONCURRENCY)) as executor:
+            futures = [executor.submit(answer_one, i, key, docs) for (i, key, _), docs in zip(pending, retrieved)]
+            for (i, key, query_vector), future in zip(pending, futures):
+                answer, sources = future.result()
+                _answer_cache_put(key, query_vector, answer, sources)
+                results[i] = (answer, sources)
+
+    return results
+
+async def aquery_fincanon(query: str, k: int = 3, portfolio_context: dict = None):
+    """Async version of query_fincanon for use inside an event loop.
+
+    Retrieval runs in a worker thread and the LLM call does not block the loop.
+    """
+    portfolio_key = _portfolio_key(portfolio_context)
+    key = _answer_cache_key(query, k, portfolio_key)
+    answer, sources, query_vector = await asyncio.to_thread(_answer_cache_get, key)
+    if answer is not None:
+        return answer, sources
+
+    qa_chain = _cached_qa_chain(portfolio_key)
+    result = await qa_chain.ainvoke({"query": query})
+    answer, sources = _format_answer(query, result, k)
+    _answer_cache_put(key, query_vector, answer, sources)
     return answer, sources
 
 
+# Static mapping of modern terms to historical equivalents used in seminal papers
+_TERM_REPLACEMENTS = {
+    "efficient frontier": ["efficient set", "E-V efficient combinations", "mean-variance frontier"],
+    "mean-variance": ["E-V analysis", "expected return and variance"],
+    "sharpe ratio": ["reward-to-variability ratio", "risk-adjusted performance"],
+    "optimal portfolio": ["efficient portfolio", "optimal E-V combination"],
+    "diversification": ["portfolio selection", "spreading of risk"],
+    "alpha": ["excess return", "abnormal return"],
+    "beta": ["systematic risk", "market sensitivity"],
+    "capm": ["capital asset pricing", "market model"],
+}
+# Plain substring alternation (no word boundaries), so "betas" still matches "beta"
+_TERM_RE = re.compile("|".join(map(re.escape, _TERM_REPLACEMENTS)))
+
+
 def expand_query_with_terminology(query: str) -> list:
     """Generate multiple query variations to bridge modern/historical terminology.
 
@@ -168,35 +567,161 @@ def expand_query_with_terminology(query: str) -> list:
     """
     query_variations = [query]  # Always include original query
 
-    # Static mapping of modern terms to historical equivalents used in seminal papers
-    term_replacements = {
-        "efficient frontier": ["efficient set", "E-V efficient combinations", "mean-variance frontier"],
-        "mean-variance": ["E-V analysis", "expected return and variance"],
-        "sharpe ratio": ["reward-to-variability ratio", "risk-adjusted performance"],
-        "optimal portfolio": ["efficient portfolio", "optimal E-V combination"],
-        "diversification": ["portfolio selection", "spreading of risk"],
-        "alpha": ["excess return", "abnormal return"],
-        "beta": ["systematic risk", "market sensitivity"],
-        "capm": ["capital asset pricing", "market model"],
-    }
-
     # Generate variations by replacing modern terms with historical ones
     query_lower = query.lower()
-    for modern_term, historical_terms in term_replacements.items():
-        if modern_term in query_lower:
-            # Add variations with each historical term
-            for historical_term in historical_terms[:2]:  # Limit to 2 historical terms per modern term
-                variation = query_lower.replace(modern_term, historical_term)
-                query_variations.append(variation)
-            break  # Only expand one concept to keep list manageable (3 queries max)
+    # One regex pass skips queries with no modern term at all; otherwise the first term
+    # in _TERM_REPLACEMENTS order that occurs wins. The ordered substring checks are kept
+    # because regex matches don't overlap ("betalpha" would only report "beta").
+    modern_term = None
+    if _TERM_RE.search(query_lower):
+        modern_term = next((term for term in _TERM_REPLACEMENTS if term in query_lower), None)
+    if modern_term is not None:
+        # Add variations with each historical term
+        for historical_term in _TERM_REPLACEMENTS[modern_term][:2]:  # Limit to 2 historical terms per modern term
+            variation = query_lower.replace(modern_term, historical_term)
+            query_variations.append(variation)
+        # Only one concept is expanded to keep the list manageable (3 queries max)
 
     return query_variations
 
 
+def _content_hash(text: str) -> int:
+    """Stable 64-bit hash of a chunk's text."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def _mmr_select(query_embedding, embeddings, k: int, lambda_mult: float) -> List[int]:
+    """Greedy maximal marginal relevance over the fetched candidates.
+
+    Same selection as langchain_qdrant's maximal_marginal_relevance, but all cosine
+    similarities come from one matrix product up front and each candidate's
+    similarity to the selected set is kept as a running max, instead of recomputing
+    similarities against every selected vector on each pick.
+    """
+    k = min(k, len(embeddings))
+    if k <= 0:
+        return []
+
+    pool = np.asarray(embeddings, dtype=np.float64)
+    query = np.asarray(query_embedding, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pool = pool / np.linalg.norm(pool, axis=1, keepdims=True)
+        query = query / np.linalg.norm(query)
+    pool = np.nan_to_num(pool, nan=0.0, posinf=0.0, neginf=0.0)
+    query = np.nan_to_num(query, nan=0.0, posinf=0.0, neginf=0.0)
+
+    sim = pool @ pool.T
+    query_sim = pool @ query
+
+    picked = int(np.argmax(query_sim))
+    idxs = [picked]
+    max_sim_to_selected = sim[:, picked].copy()
+    available = np.ones(len(pool), dtype=bool)
+    available[picked] = False
+    while len(idxs) < k:
+        scores = lambda_mult * query_sim - (1 - lambda_mult) * max_sim_to_selected
+        scores[~available] = -np.inf
+        picked = int(np.argmax(scores))
+        idxs.append(picked)
+        available[picked] = False
+        np.maximum(max_sim_to_selected, sim[:, picked], out=max_sim_to_selected)
+    return idxs
+
+
+class FinCanonVectorStore(QdrantVectorStore):
+    """QdrantVectorStore whose MMR search uses a precomputed similarity matrix."""
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: models.Filter = None,
+        search_params: models.SearchParams = None,
+        score_threshold: float = None,
+        consistency: models.ReadConsistency = None,
+        **kwargs,
+    ):
+        results = self.client.query_points(
+            collection_name=self.collection_name,
+            query=embedding,
+            query_filter=filter,
+            search_params=search_params,
+            limit=fetch_k,
+            with_payload=True,
+            with_vectors=True,
+            score_threshold=score_threshold,
+            consistency=consistency,
+            using=self.vector_name,
+            **kwargs,
+        ).points
+
+        return self._mmr_from_points(embedding, results, k, lambda_mult)
+
+    def _mmr_from_points(self, embedding, points, k: int, lambda_mult: float):
+        """Run MMR over fetched points and return (Document, score) pairs."""
+        embeddings = [
+            point.vector if isinstance(point.vector, list) else point.vector.get(self.vector_name)
+            for point in points
+        ]
+        return [
+            (
+                self._document_from_point(
+                    points[i], self.collection_name, self.content_payload_key, self.metadata_payload_key
+                ),
+                points[i].score,
+            )
+            for i in _mmr_select(embedding, embeddings, k=k, lambda_mult=lambda_mult)
+        ]
+
+    def max_marginal_relevance_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        search_params: models.SearchParams = None,
+    ) -> List[List[Document]]:
+        """MMR search for several queries with one embedding request and one Qdrant call.
+
+        Each query gets its own fetch_k candidates and MMR selection, exactly as if
+        searched separately.
+        """
+        vectors = self.embeddings.embed_queries(queries)
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=vector,
+                    using=self.vector_name or None,
+                    params=search_params,
+                    limit=fetch_k,
+                    with_payload=True,
+                    with_vector=True,
+                )
+                for vector in vectors
+            ],
+        )
+        return [
+            [doc for doc, _ in self._mmr_from_points(vector, response.points, k, lambda_mult)]
+            for vector, response in zip(vectors, responses)
+        ]
+
+
+# MMR search settings for every query variation
+RETRIEVER_SEARCH_KWARGS = {
+    "k": 10,           # Get 10 chunks per query variation
+    "fetch_k": 40,
+    "lambda_mult": 0.8,
+    "search_params": models.SearchParams(hnsw_ef=128, exact=False)
+}
+
+
 class MultiQueryRetriever(BaseRetriever):
     """Custom retriever that expands queries with historical terminology."""
 
-    vectorstore: QdrantVectorStore
+    vectorstore: FinCanonVectorStore
     base_retriever: BaseRetriever
 
     class Config:
@@ -205,34 +730,31 @@ class MultiQueryRetriever(BaseRetriever):
     def __init__(self, vectorstore, **kwargs):
         base_retriever = vectorstore.as_retriever(
             search_type="mmr",
-            search_kwargs={
-                "k": 10,           # Get 10 chunks per query variation
-                "fetch_k": 40,
-                "lambda_mult": 0.8
-            }
+            search_kwargs=RETRIEVER_SEARCH_KWARGS
         )
         super().__init__(vectorstore=vectorstore, base_retriever=base_retriever, **kwargs)
 
-    def _get_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None
-    ) -> List[Document]:
-        """Retrieve documents using query expansion for historical terminology."""
-        # Generate query variations
+    def _expand(self, query: str) -> list:
+        """Generate and log the query variations."""
         query_variations = expand_query_with_terminology(query)
 
-        print(f"\n🔍 Query expansion: {len(query_variations)} variations")
-        for i, var in enumerate(query_variations):
-            print(f"  [{i+1}] {var}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 Query expansion: %d variations\n%s", len(query_variations),
+                         "\n".join(f"  [{i+1}] {var}" for i, var in enumerate(query_variations)))
+        return query_variations
 
-        # Retrieve documents for each query variation
+    @staticmethod
+    def _merge_unique(doc_lists) -> List[Document]:
+        """Concatenate per-variation results in order, dropping repeated chunks."""
         all_docs = []
         seen_content = set()  # Track unique chunks by content hash
 
-        for query_var in query_variations:
-            docs = self.base_retriever.get_relevant_documents(query_var)
+        for docs in doc_lists:
             for doc in docs:
-                # Deduplicate by content hash
-                content_hash = hash(doc.page_content[:200])
+                # Deduplicate by a hash of the full text rather than the point ID:
+                # collections ingested before IDs were derived from the content hold
+                # random-ID duplicates of the same chunk
+                content_hash = _content_hash(doc.page_content)
                 if content_hash not in seen_content:
                     seen_content.add(content_hash)
                     all_docs.append(doc)
@@ -240,28 +762,182 @@ class MultiQueryRetriever(BaseRetriever):
         # Return top 15 unique documents
         return all_docs[:15]
 
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None
+    ) -> List[Document]:
+        """Retrieve documents using query expansion for historical terminology."""
+        query_variations = self._expand(query)
+
+        # All variations are embedded in one request and searched in one Qdrant batch
+        return self._merge_unique(
+            self.vectorstore.max_marginal_relevance_search_batch(
+                query_variations, **self.base_retriever.search_kwargs
+            )
+        )
 
-def build_qa_chain(portfolio_context: dict = None):
-    """Build a QA chain with optional portfolio context.
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun = None
+    ) -> List[Document]:
+        """Async retrieval: the batched search runs in a worker thread off the event loop."""
+        return await asyncio.to_thread(self._get_relevant_documents, query)
 
-    Args:
-        portfolio_context: Optional dict with portfolio metrics to enhance answers
+
+class CachingEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings that memoizes query embeddings by whitespace-normalized text.
+
+    Repeated questions and the retriever's expanded variations would otherwise each
+    cost an OpenAI round trip. With disk_cache_path set, in-memory misses are looked up
+    in a SQLite file keyed by a SHA-1 of the model and text, so re-runs of the same
+    questions skip the API entirely. Document embedding is not cached.
     """
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+
+    query_cache_size: int = 2048
+    disk_cache_path: Optional[str] = None
+
+    _query_cache = PrivateAttr(default_factory=OrderedDict)
+    _query_cache_lock = PrivateAttr(default_factory=threading.Lock)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending only the uncached ones in a single request."""
+        keys = [" ".join(text.split()) for text in texts]
+        found = {}
+        with self._query_cache_lock:
+            for key in keys:
+                if key in self._query_cache:
+                    self._query_cache.move_to_end(key)
+                    found[key] = self._query_cache[key]
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        fetched = {}
+        if missing and self.disk_cache_path:
+            fetched.update(self._disk_cache_get(missing))
+            missing = [key for key in missing if key not in fetched]
+        if missing:
+            # OpenAI embeds a query the same way as a document, so misses share one request
+            vectors = super().embed_documents(missing)
+            embedded = dict(zip(missing, vectors))
+            if self.disk_cache_path:
+                self._disk_cache_put(embedded)
+            fetched.update(embedded)
+        if fetched:
+            with self._query_cache_lock:
+                for key, vector in fetched.items():
+                    # Tuples so callers can't mutate a cached vector
+                    found[key] = self._query_cache[key] = tuple(vector)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+
+        return [list(found[key]) for key in keys]
+
+    def _disk_key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _disk_connect(self) -> sqlite3.Connection:
+        # A short-lived connection per call keeps this safe across threads and processes
+        os.makedirs(os.path.dirname(self.disk_cache_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.disk_cache_path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        return conn
+
+    def _disk_cache_get(self, texts: List[str]) -> dict:
+        by_key = {self._disk_key(text): text for text in texts}
+        try:
+            conn = self._disk_connect()
+            try:
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(by_key))})",
+                    list(by_key),
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Query embedding cache unavailable: %s", e)
+            return {}
+        return {by_key[key]: np.frombuffer(blob, dtype=np.float64).tolist() for key, blob in rows}
+
+    def _disk_cache_put(self, embedded: dict) -> None:
+        rows = [
+            (self._disk_key(text), np.asarray(vector, dtype=np.float64).tobytes())
+            for text, vector in embedded.items()
+        ]
+        try:
+            conn = self._disk_connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Could not write query embedding cache: %s", e)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+
+# Process-wide clients reused by every QA chain. Building these per query re-creates
+# the OpenAI HTTP client and re-opens the Qdrant connection on each request.
+@lru_cache(maxsize=1)
+def _embeddings():
+    return CachingEmbeddings(model=EMBEDDING_MODEL, disk_cache_path=QUERY_EMBEDDING_CACHE or None)
+
+
+@lru_cache(maxsize=1)
+def _qdrant_client():
+    grpc_kwargs = {}
+    if QDRANT_PREFER_GRPC:
+        grpc_kwargs = dict(
+            prefer_grpc=True,
+            grpc_options={"grpc.max_receive_message_length": 64 * 1024 * 1024}
+        )
     if QDRANT_API_KEY:
-        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-    else:
-        client = QdrantClient(QDRANT_URL)
+        return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, **grpc_kwargs)
+    return QdrantClient(QDRANT_URL, **grpc_kwargs)
 
-    # Create vectorstore
-    vectorstore = QdrantVectorStore(
-        client=client,
-        collection_name="fincanon_papers",
-        embedding=embeddings
+
+@lru_cache(maxsize=1)
+def _vectorstore():
+    return FinCanonVectorStore(
+        client=_qdrant_client(),
+        collection_name=COLLECTION_NAME,
+        embedding=_embeddings()
     )
 
+
+@lru_cache(maxsize=1)
+def _llm():
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+
+@lru_cache(maxsize=16)
+def _cached_qa_chain(portfolio_key: bytes):
+    """QA chain for a portfolio context, reused across follow-up questions about it.
+
+    Keyed by the context's canonical JSON (see _portfolio_key), since the context is
+    only used to render the prompt, which is therefore formatted once per portfolio.
+    """
+    return build_qa_chain(portfolio_context=orjson.loads(portfolio_key))
+
+
+def _portfolio_key(portfolio_context: dict = None) -> bytes:
+    """Canonical JSON of a portfolio context, used as a cache key.
+
+    Contexts from analyze_portfolio hold NumPy arrays and scalars; they are written
+    in full (NaN as null), exactly as /analyze sends them to the frontend.
+    """
+    return orjson.dumps(portfolio_context, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def build_qa_chain(portfolio_context: dict = None):
+    """Build a QA chain with optional portfolio context.
+
+    The prompt is rebuilt per call since it embeds the portfolio context;
+    the embeddings, Qdrant connection and LLM client are shared across calls.
+
+    Args:
+        portfolio_context: Optional dict with portfolio metrics to enhance answers
+    """
     # Use custom multi-query retriever with terminology expansion
-    retriever = MultiQueryRetriever(vectorstore)
+    retriever = MultiQueryRetriever(_vectorstore())
 
     # Build portfolio context string if provided
     portfolio_info = ""
@@ -445,9 +1121,8 @@ Answer:""",
     )
 
     # Wrap retriever with GPT
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
     qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
+        llm=_llm(),
         retriever=retriever,
         chain_type="stuff",
         chain_type_kwargs={"prompt": custom_prompt},
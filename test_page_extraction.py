@@ -1,12 +1,13 @@
 """Test page number extraction after fix"""
+from concurrent.futures import ProcessPoolExecutor
+
 from langchain_community.document_loaders import UnstructuredPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-def test_page_extraction(pdf_path, doc_title):
-    print(f"\n{'='*60}")
-    print(f"Testing: {doc_title}")
-    print('='*60)
+BAR = "=" * 60
 
+def load_chunks(pdf_path, doc_title):
+    """Load, chunk and normalize one PDF (runs in a worker process)."""
     # Load with mode='elements'
     loader = UnstructuredPDFLoader(pdf_path, mode="elements")
     docs = loader.load()
@@ -26,11 +27,19 @@ def test_page_extraction(pdf_path, doc_title):
         if "page" in chunk.metadata and "page_number" not in chunk.metadata:
             page_num = page_num + 1 if page_num is not None else None
 
-        chunk.metadata = {
-            "title": doc_title,
-            "page": page_num,
-            "source": chunk.metadata.get("source", pdf_path)
-        }
+        # Rewrite the chunk's own dict in place (the splitter gives each chunk a copy)
+        source = chunk.metadata.get("source", pdf_path)
+        chunk.metadata.clear()
+        chunk.metadata["title"] = doc_title
+        chunk.metadata["page"] = page_num
+        chunk.metadata["source"] = source
+
+    return chunks
+
+def print_page_report(doc_title, chunks):
+    print(f"\n{BAR}")
+    print(f"Testing: {doc_title}")
+    print(BAR)
 
     print(f"Total chunks: {len(chunks)}")
 
@@ -62,9 +71,16 @@ pdfs = [
     ("src/FAMA_FRENCH.pdf", "The Cross-Section of Expected Stock Returns")
 ]
 
-for pdf_path, title in pdfs:
-    test_page_extraction(pdf_path, title)
+def _load_chunks_worker(args):
+    return load_chunks(*args)
+
+if __name__ == "__main__":
+    # Partitioning is CPU-bound, so the PDFs load in parallel processes;
+    # reports are printed afterwards in order so their output doesn't interleave
+    with ProcessPoolExecutor(max_workers=len(pdfs)) as executor:
+        for (pdf_path, title), chunks in zip(pdfs, executor.map(_load_chunks_worker, pdfs)):
+            print_page_report(title, chunks)
 
-print("\n" + "="*60)
-print("✅ Page extraction test complete!")
-print("="*60)
+    print("\n" + BAR)
+    print("✅ Page extraction test complete!")
+    print(BAR)
@@ -2,12 +2,14 @@ from langchain_community.document_loaders import UnstructuredPDFLoader
 try:
     from langchain_community.document_loaders import PyMuPDFLoader
     PYMUPDF_AVAILABLE = True
-except:
+except ImportError:
     PYMUPDF_AVAILABLE = False
 
-print("="*60)
+BAR = "=" * 60
+
+print(BAR)
 print("Option 1: UnstructuredPDFLoader with mode='elements'")
-print("="*60)
+print(BAR)
 
 loader = UnstructuredPDFLoader("src/markowitz_JF.pdf", mode="elements")
 docs = loader.load()
@@ -20,9 +22,9 @@ for i, doc in enumerate(docs[:5]):
     print(f"  Content preview: {doc.page_content[:80]}...")
 
 if PYMUPDF_AVAILABLE:
-    print("\n" + "="*60)
+    print("\n" + BAR)
     print("Option 2: PyMuPDFLoader")
-    print("="*60)
+    print(BAR)
 
     loader = PyMuPDFLoader("src/markowitz_JF.pdf")
     docs = loader.load()
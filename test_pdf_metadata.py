@@ -1,5 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor
+
 from langchain_community.document_loaders import UnstructuredPDFLoader
 
+BAR = "=" * 60
+
 # Test each PDF to see what metadata keys are present
 pdfs = [
     ("markowitz_JF.pdf", "Markowitz"),
@@ -7,19 +11,27 @@ pdfs = [
     ("FAMA_FRENCH.pdf", "Fama-French")
 ]
 
-for pdf_path, name in pdfs:
-    print(f"\n{'='*60}")
-    print(f"Testing: {name}")
-    print('='*60)
-
+def load_docs(pdf_path):
+    """Load one PDF (runs in a worker process)."""
     loader = UnstructuredPDFLoader(f"src/{pdf_path}")
-    docs = loader.load()
+    return loader.load()
+
+if __name__ == "__main__":
+    # Loading is CPU-bound, so the PDFs load in parallel processes;
+    # output is printed afterwards in order
+    with ProcessPoolExecutor(max_workers=len(pdfs)) as executor:
+        loaded = executor.map(load_docs, [pdf_path for pdf_path, _ in pdfs])
+
+        for (pdf_path, name), docs in zip(pdfs, loaded):
+            print(f"\n{BAR}")
+            print(f"Testing: {name}")
+            print(BAR)
 
-    print(f"Total documents loaded: {len(docs)}")
+            print(f"Total documents loaded: {len(docs)}")
 
-    # Show metadata from first few docs
-    for i, doc in enumerate(docs[:3]):
-        print(f"\nDocument {i+1} metadata:")
-        print(f"  Keys: {list(doc.metadata.keys())}")
-        print(f"  Full metadata: {doc.metadata}")
-        print(f"  Content preview: {doc.page_content[:100]}...")
+            # Show metadata from first few docs
+            for i, doc in enumerate(docs[:3]):
+                print(f"\nDocument {i+1} metadata:")
+                print(f"  Keys: {list(doc.metadata.keys())}")
+                print(f"  Full metadata: {doc.metadata}")
+                print(f"  Content preview: {doc.page_content[:100]}...")
@@ -1,8 +1,14 @@
 """Test portfolio-aware RAG queries"""
+import os
 import sys
 sys.path.append('src')
 
-from pipeline import query_fincanon
+# Repeat runs ask the same questions, so their embeddings are persisted between runs
+os.environ.setdefault("QUERY_EMBEDDING_CACHE", ".cache/query_embeddings.sqlite")
+
+from pipeline import batch_query_fincanon
+
+BAR = "=" * 70
 
 # Sample portfolio metrics (like what frontend sends)
 sample_metrics = {
@@ -21,43 +27,51 @@ sample_metrics = {
     }
 }
 
-print("="*70)
-print("TEST 1: Query WITHOUT portfolio context")
-print("="*70)
-
 question1 = "What is the Sharpe ratio and why is it important?"
-print(f"\nQuestion: {question1}\n")
+question2 = "How does my portfolio's Sharpe ratio compare to theoretical expectations?"
+question3 = "Should I diversify more given my current volatility?"
 
-answer1, sources1 = query_fincanon(question1, k=2, portfolio_context=None)
-print(f"Answer: {answer1}\n")
-print(f"Sources: {len(sources1)} documents")
+# One batched retrieval for all three questions (one embedding request, one Qdrant call),
+# then the three answers are generated concurrently
+(answer1, sources1), (answer2, sources2), (answer3, sources3) = batch_query_fincanon(
+    [question1, question2, question3],
+    k=2,
+    portfolio_contexts=[None, sample_metrics, sample_metrics],
+)
 
-print("\n" + "="*70)
-print("TEST 2: Query WITH portfolio context (portfolio-aware)")
-print("="*70)
+# Output lines are collected and written in one call at the end
+out = []
 
-question2 = "How does my portfolio's Sharpe ratio compare to theoretical expectations?"
-print(f"\nQuestion: {question2}\n")
-print(f"Portfolio Context:")
-print(f"  - Annual Return: {sample_metrics['portfolio_return_annual']:.2%}")
-print(f"  - Annual Volatility: {sample_metrics['portfolio_vol_annual']:.2%}")
-print(f"  - Annual Sharpe: {sample_metrics['portfolio_sharpe_annual']:.2f}\n")
+out.append(BAR)
+out.append("TEST 1: Query WITHOUT portfolio context")
+out.append(BAR)
 
-answer2, sources2 = query_fincanon(question2, k=2, portfolio_context=sample_metrics)
-print(f"Answer: {answer2}\n")
-print(f"Sources: {len(sources2)} documents")
+out.append(f"\nQuestion: {question1}\n")
+out.append(f"Answer: {answer1}\n")
+out.append(f"Sources: {len(sources1)} documents")
 
-print("\n" + "="*70)
-print("TEST 3: Portfolio diversification question with context")
-print("="*70)
+out.append("\n" + BAR)
+out.append("TEST 2: Query WITH portfolio context (portfolio-aware)")
+out.append(BAR)
 
-question3 = "Should I diversify more given my current volatility?"
-print(f"\nQuestion: {question3}\n")
+out.append(f"\nQuestion: {question2}\n")
+out.append(f"Portfolio Context:")
+out.append(f"  - Annual Return: {sample_metrics['portfolio_return_annual']:.2%}")
+out.append(f"  - Annual Volatility: {sample_metrics['portfolio_vol_annual']:.2%}")
+out.append(f"  - Annual Sharpe: {sample_metrics['portfolio_sharpe_annual']:.2f}\n")
+
+out.append(f"Answer: {answer2}\n")
+out.append(f"Sources: {len(sources2)} documents")
+
+out.append("\n" + BAR)
+out.append("TEST 3: Portfolio diversification question with context")
+out.append(BAR)
 
-answer3, sources3 = query_fincanon(question3, k=2, portfolio_context=sample_metrics)
-print(f"Answer: {answer3}\n")
-print(f"Sources: {len(sources3)} documents")
+out.append(f"\nQuestion: {question3}\n")
+out.append(f"Answer: {answer3}\n")
+out.append(f"Sources: {len(sources3)} documents")
 
-print("\n" + "="*70)
-print("✅ Portfolio-aware RAG tests complete!")
-print("="*70)
+out.append("\n" + BAR)
+out.append("✅ Portfolio-aware RAG tests complete!")
+out.append(BAR)
+sys.stdout.write("\n".join(out) + "\n")
@@ -4,53 +4,73 @@ import sys
 sys.path.insert(0, 'src')
 
 import pandas as pd
-from metrics import analyze_portfolio
+from metrics import analyze_portfolio, calculate_max_drawdown
+from portfolio_fixtures import load_portfolio
 
-# Load the diversified portfolio
-df = pd.read_csv('data/diversified_portfolio.csv', index_col=0, parse_dates=True)
+BAR = "=" * 70
 
-print("="*70)
-print("TESTING TIER 1 METRICS - Diversified Portfolio")
-print("="*70)
-print(f"\nPortfolio: {', '.join(df.columns)}")
-print(f"Date Range: {df.index[0].date()} to {df.index[-1].date()}")
-print(f"Trading Days: {len(df)}")
-
-# Analyze with equal weights
+# Load and analyze the diversified portfolio (equal weights)
+df = load_portfolio('data/diversified_portfolio.csv')
 results = analyze_portfolio(df)
 
-print("\n" + "="*70)
-print("PORTFOLIO METRICS")
-print("="*70)
+# Output lines are collected and written in one call at the end
+out = []
+
+out.append(BAR)
+out.append("TESTING TIER 1 METRICS - Diversified Portfolio")
+out.append(BAR)
+out.append(f"\nPortfolio: {', '.join(df.columns)}")
+out.append(f"Date Range: {df.index[0].date()} to {df.index[-1].date()}")
+out.append(f"Trading Days: {len(df)}")
+
+out.append("\n" + BAR)
+out.append("PORTFOLIO METRICS")
+out.append(BAR)
 
-print("\n--- BASIC METRICS ---")
-print(f"Annual Return:       {results['portfolio_return_annual']:.2%}")
-print(f"Annual Volatility:   {results['portfolio_vol_annual']:.2%}")
-print(f"Sharpe Ratio:        {results['portfolio_sharpe_annual']:.4f}")
+out.append("\n--- BASIC METRICS ---")
+out.append(f"Annual Return:       {results['portfolio_return_annual']:.2%}")
+out.append(f"Annual Volatility:   {results['portfolio_vol_annual']:.2%}")
+out.append(f"Sharpe Ratio:        {results['portfolio_sharpe_annual']:.4f}")
 
-print("\n--- TIER 1: ADVANCED RISK METRICS ---")
-print(f"Maximum Drawdown:    {results['max_drawdown']:.2%}")
-print(f"Sortino Ratio (Ann): {results['sortino_ratio_annual']:.4f}")
-print(f"Beta vs SPY:         {results['beta']:.4f}" if not pd.isna(results['beta']) else "Beta vs SPY:         N/A (SPY not in portfolio)")
-print(f"Diversification:     {results['diversification_ratio']:.4f}")
+out.append("\n--- TIER 1: ADVANCED RISK METRICS ---")
+out.append(f"Maximum Drawdown:    {results['max_drawdown']:.2%}")
+out.append(f"Sortino Ratio (Ann): {results['sortino_ratio_annual']:.4f}")
+out.append(f"Beta vs SPY:         {results['beta']:.4f}" if not pd.isna(results['beta']) else "Beta vs SPY:         N/A (SPY not in portfolio)")
+out.append(f"Diversification:     {results['diversification_ratio']:.4f}")
 
-print("\n--- CORRELATION MATRIX (Top 3 Pairs) ---")
-corr_df = pd.DataFrame(results['correlation_matrix'])
-# Get upper triangle of correlation matrix
+# Missing returns are skipped, not propagated through the rest of the path;
+# checked against pandas' NaN-skipping cumprod and running max
+gappy_returns = df.mean(axis=1)
+gappy_returns.iloc[[5, 40]] = float('nan')
+gappy_growth = (1 + gappy_returns).cumprod()
+reference_dd = (gappy_growth / gappy_growth.expanding().max() - 1).min()
+gappy_dd = calculate_max_drawdown(gappy_returns)
+if not abs(gappy_dd - reference_dd) < 1e-12:
+    sys.exit(f"Max drawdown with gaps {gappy_dd} != pandas reference {reference_dd}")
+out.append(f"Max DD (with gaps):  {gappy_dd:.2%}")
+
+out.append("\n--- CORRELATION MATRIX (Top 3 Pairs) ---")
 import numpy as np
-mask = np.triu(np.ones_like(corr_df, dtype=bool), k=1)
-corr_pairs = corr_df.where(mask).stack().sort_values(ascending=False)
-for i, (pair, corr) in enumerate(corr_pairs.head(3).items()):
-    print(f"{pair[0]}-{pair[1]}: {corr:.3f}")
-
-print("\n--- ASSET-LEVEL STATS ---")
-assets_df = pd.DataFrame({
-    'Annual Return': {k: v*252 for k, v in results['asset_means'].items()},
-    'Annual Vol': {k: v*np.sqrt(252) for k, v in results['asset_vols'].items()}
-})
-assets_df['Sharpe'] = assets_df['Annual Return'] / assets_df['Annual Vol']
-print(assets_df.sort_values('Sharpe', ascending=False).to_string())
-
-print("\n" + "="*70)
-print("✅ Tier 1 metrics calculated successfully!")
-print("="*70 + "\n")
+# Upper-triangle pairs come precomputed; partition out the top 3 instead of sorting every pair
+names = results['asset_names']
+pairs = results['correlation_pairs']
+pair_corrs = pairs['correlation']
+n_top = min(3, len(pair_corrs))
+top = np.argpartition(-pair_corrs, n_top - 1)[:n_top] if n_top else np.array([], dtype=int)
+top = top[np.argsort(-pair_corrs[top])]
+for t in top:
+    out.append(f"{names[pairs['asset1'][t]]}-{names[pairs['asset2'][t]]}: {pair_corrs[t]:.3f}")
+
+out.append("\n--- ASSET-LEVEL STATS ---")
+annual_returns = results['asset_mu'] * 252
+annual_vols = results['asset_sigma'] * np.sqrt(252)
+assets_df = pd.DataFrame(
+    {'Annual Return': annual_returns, 'Annual Vol': annual_vols, 'Sharpe': annual_returns / annual_vols},
+    index=results['asset_names'],
+)
+out.append(assets_df.sort_values('Sharpe', ascending=False).to_string())
+
+out.append("\n" + BAR)
+out.append("✅ Tier 1 metrics calculated successfully!")
+out.append(BAR + "\n")
+sys.stdout.write("\n".join(out) + "\n")
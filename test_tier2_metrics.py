@@ -3,63 +3,99 @@
 import sys
 sys.path.insert(0, 'src')
 
-import pandas as pd
+import numpy as np
 from metrics import analyze_portfolio
+from portfolio_fixtures import load_portfolio
 
-# Load the diversified portfolio
-df = pd.read_csv('data/diversified_portfolio.csv', index_col=0, parse_dates=True)
+BAR = "=" * 70
 
-print("="*70)
-print("TESTING TIER 2 METRICS - Portfolio Optimization")
-print("="*70)
-print(f"\nPortfolio: {', '.join(df.columns)}")
-
-# Analyze with equal weights
+# Load and analyze the diversified portfolio (equal weights)
+df = load_portfolio('data/diversified_portfolio.csv')
 results = analyze_portfolio(df)
+assets = tuple(df.columns)
+
+
+def weight_lines(weights, threshold=0.01):
+    """Lines for the non-negligible weights, selected with one vectorized mask."""
+    w = np.asarray(weights)
+    return [f"  {assets[i]}: {w[i]:.1%}" for i in np.flatnonzero(w > threshold)]
+
+
+# Output lines are collected and written in two calls: the analysis of the sample
+# covariance is written before the shrunk covariance is analyzed, the rest at the end
+out = []
 
-print("\n" + "="*70)
-print("CURRENT PORTFOLIO (Equal-Weighted)")
-print("="*70)
-print(f"Return:     {results['portfolio_return_annual']:.2%}")
-print(f"Volatility: {results['portfolio_vol_annual']:.2%}")
-print(f"Sharpe:     {results['portfolio_sharpe_annual']:.3f}")
+out.append(BAR)
+out.append("TESTING TIER 2 METRICS - Portfolio Optimization")
+out.append(BAR)
+out.append(f"\nPortfolio: {', '.join(assets)}")
 
-print("\n" + "="*70)
-print("OPTIMAL PORTFOLIOS")
-print("="*70)
+out.append("\n" + BAR)
+out.append("CURRENT PORTFOLIO (Equal-Weighted)")
+out.append(BAR)
+out.append(f"Return:     {results['portfolio_return_annual']:.2%}")
+out.append(f"Volatility: {results['portfolio_vol_annual']:.2%}")
+out.append(f"Sharpe:     {results['portfolio_sharpe_annual']:.3f}")
+
+out.append("\n" + BAR)
+out.append("OPTIMAL PORTFOLIOS")
+out.append(BAR)
 
 # Minimum Variance Portfolio
 min_var = results['optimal_portfolios']['min_variance']
-print("\n🔹 MINIMUM VARIANCE PORTFOLIO")
-print(f"Return:     {min_var['return']:.2%}")
-print(f"Volatility: {min_var['volatility']:.2%}")
-print(f"Sharpe:     {min_var['sharpe']:.3f}")
-print("\nWeights:")
-for i, (asset, weight) in enumerate(zip(df.columns, min_var['weights'])):
-    if weight > 0.01:  # Only show non-negligible weights
-        print(f"  {asset}: {weight:.1%}")
+out.append("\n🔹 MINIMUM VARIANCE PORTFOLIO")
+out.append(f"Return:     {min_var['return']:.2%}")
+out.append(f"Volatility: {min_var['volatility']:.2%}")
+out.append(f"Sharpe:     {min_var['sharpe']:.3f}")
+out.append("\nWeights:")
+out.extend(weight_lines(min_var['weights']))  # Only show non-negligible weights
 
 # Maximum Sharpe Portfolio
 max_sharpe = results['optimal_portfolios']['max_sharpe']
-print("\n🔹 MAXIMUM SHARPE PORTFOLIO")
-print(f"Return:     {max_sharpe['return']:.2%}")
-print(f"Volatility: {max_sharpe['volatility']:.2%}")
-print(f"Sharpe:     {max_sharpe['sharpe']:.3f}")
-print("\nWeights:")
-for i, (asset, weight) in enumerate(zip(df.columns, max_sharpe['weights'])):
-    if weight > 0.01:
-        print(f"  {asset}: {weight:.1%}")
+out.append("\n🔹 MAXIMUM SHARPE PORTFOLIO")
+out.append(f"Return:     {max_sharpe['return']:.2%}")
+out.append(f"Volatility: {max_sharpe['volatility']:.2%}")
+out.append(f"Sharpe:     {max_sharpe['sharpe']:.3f}")
+out.append("\nWeights:")
+out.extend(weight_lines(max_sharpe['weights']))
 
 # Efficient Frontier
-print("\n" + "="*70)
-print("EFFICIENT FRONTIER")
-print("="*70)
-print(f"\n{len(results['efficient_frontier'])} portfolios calculated")
-print("\nSample points:")
-for i in [0, len(results['efficient_frontier'])//2, -1]:
-    point = results['efficient_frontier'][i]
-    print(f"  Return: {point['return']:.2%}, Vol: {point['volatility']:.2%}")
-
-print("\n" + "="*70)
-print("✅ Tier 2 optimization complete!")
-print("="*70 + "\n")
+out.append("\n" + BAR)
+out.append("EFFICIENT FRONTIER")
+out.append(BAR)
+frontier_returns = results['frontier_returns']
+frontier_vols = results['frontier_vols']
+out.append(f"\n{len(frontier_returns)} portfolios calculated")
+out.append("\nSample points:")
+for i in [0, len(frontier_returns)//2, -1]:
+    out.append(f"  Return: {frontier_returns[i]:.2%}, Vol: {frontier_vols[i]:.2%}")
+
+sys.stdout.write("\n".join(out) + "\n")
+out.clear()
+
+# Same optimization on the Ledoit-Wolf shrunk covariance
+shrunk_results = analyze_portfolio(df, shrink=True)
+shrunk_min_var = shrunk_results['optimal_portfolios']['min_variance']
+out.append("\n" + BAR)
+out.append("MINIMUM VARIANCE WITH LEDOIT-WOLF SHRINKAGE")
+out.append(BAR)
+out.append(f"Volatility: {shrunk_min_var['volatility']:.2%}")
+out.append("\nWeights:")
+out.extend(weight_lines(shrunk_min_var['weights']))
+
+# Shrinkage with missing returns (estimated on the complete rows)
+gappy_df = df.copy()
+gappy_df.iloc[[5, 40], [0, 2]] = np.nan
+gappy_min_var = analyze_portfolio(gappy_df, shrink=True)['optimal_portfolios']['min_variance']
+gappy_weights = np.asarray(gappy_min_var['weights'])
+# Two missing days barely move the estimate: a valid long-only portfolio close to the complete-data one
+if not (np.isfinite(gappy_min_var['volatility'])
+        and abs(gappy_min_var['volatility'] - shrunk_min_var['volatility']) < 0.005
+        and np.isclose(gappy_weights.sum(), 1.0) and (gappy_weights >= -1e-9).all()):
+    sys.exit(f"Shrunk min-variance portfolio with missing returns is invalid: {gappy_min_var}")
+out.append(f"\nWith missing returns: Volatility {gappy_min_var['volatility']:.2%}")
+
+out.append("\n" + BAR)
+out.append("✅ Tier 2 optimization complete!")
+out.append(BAR + "\n")
+sys.stdout.write("\n".join(out) + "\n")